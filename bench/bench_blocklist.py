@@ -0,0 +1,109 @@
+"""Ad/tracker domain lookups: the reversed-label trie vs a linear scan of the list, as a naive route handler would.
+
+Builds a synthetic EasyList of --domains host rules (or reads --file lists), then reports the time and peak Python
+allocation to load it, and the per-lookup cost of trie matching on a mix of listed subdomains and unlisted hosts.
+The linear baseline checks every listed domain as a suffix, so it is only run on the first --linear-domains.
+
+    python bench/bench_blocklist.py [--domains 10000,100000] [--lookups 100000] [--file easylist.txt ...]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clawfox import _blocklist  # noqa: E402
+
+_TLDS = ("com", "net", "org", "io", "co.uk", "de", "fr", "jp")
+_SYLLABLES = "ad track pix stat metric cdn tag beacon log click serv sync media analytic count".split()
+
+
+def _name(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))) + str(rng.randint(0, 999))
+
+
+def synthetic_list(n: int, seed: int = 0) -> list[str]:
+    """Deterministic list of n ||domain^ rules, a tenth of them third-party only."""
+    rng = random.Random(seed)
+    return [
+        f"||{_name(rng)}.{rng.choice(_TLDS)}^" + ("$third-party" if rng.random() < 0.1 else "") for _ in range(n)
+    ]
+
+
+def _hosts(rules: list[str], n: int, seed: int = 1) -> list[str]:
+    """n hosts: half subdomains of listed domains, half unlisted."""
+    rng = random.Random(seed)
+    listed = [r[2:].split("^", 1)[0] for r in rules]
+    return [
+        f"{rng.choice(('www', 'img', 'a.b'))}.{rng.choice(listed)}" if i % 2 else f"www.{_name(rng)}.example"
+        for i in range(n)
+    ]
+
+
+def _load(path: str) -> tuple[_blocklist.Blocklist, float, float]:
+    os.environ["CLAWFOX_BLOCKLISTS"] = path
+    t0 = time.perf_counter()
+    _blocklist.Blocklist().load()
+    ms = (time.perf_counter() - t0) * 1000
+    tracemalloc.start()
+    lists = _blocklist.Blocklist()
+    lists.load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return lists, ms, peak / 1e6
+
+
+def _linear_match(domains: list[str], host: str) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--domains", default="10000,100000", help="Synthetic list sizes (comma-separated)")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Hosts looked up per list")
+    parser.add_argument("--linear-domains", type=int, default=10_000, help="Largest list the linear scan runs on")
+    parser.add_argument("--file", action="append", default=[], help="Also load this list file (repeatable)")
+    args = parser.parse_args()
+
+    lists = [(f"synthetic {n}", synthetic_list(int(n))) for n in args.domains.split(",") if n]
+    for path in args.file:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lists.append((os.path.basename(path)[:20], f.read().splitlines()))
+
+    print(
+        f"{'list':20s} {'domains':>8s} {'load ms':>8s} {'peak MB':>8s} {'trie us':>8s} {'linear us':>10s} {'hit %':>6s}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, lines in lists:
+            path = os.path.join(tmp, "list.txt")
+            with open(path, "w") as f:
+                f.write("\n".join(lines))
+            loaded, load_ms, peak = _load(path)
+            hosts = _hosts([line for line in lines if line.startswith("||")] or ["||example.com^"], args.lookups)
+            t0 = time.perf_counter()
+            for host in hosts:
+                loaded.check(host, True)
+            trie_us = (time.perf_counter() - t0) * 1e6 / len(hosts)
+            linear = "-"
+            if loaded.trie.size <= args.linear_domains:
+                domains = [d for line in lines for d, _ in _blocklist.parse_line(line)]
+                sample = hosts[:1000]
+                t0 = time.perf_counter()
+                for host in sample:
+                    _linear_match(domains, host)
+                linear = f"{(time.perf_counter() - t0) * 1e6 / len(sample):.1f}"
+            rate = 100 * loaded.blocked / loaded.checked
+            print(
+                f"{label:20s} {loaded.trie.size:8d} {load_ms:8.0f} {peak:8.1f} {trie_us:8.2f} {linear:>10s} "
+                f"{rate:6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Page-to-markdown cost: the Python converter (page.content() + markdownify) vs the in-page DOM walk.
+
+Loads synthetic pages of increasing size (or --url pages) into one headless Chromium and times, per page, what
+_page_output does for each converter (without the screenshot): serialise + element scan + convert in Python, or
+one PAGE_MARKDOWN_JS evaluate. Reports the median time and the bytes crossing the Playwright connection.
+
+    python bench/bench_convert.py [--runs 5] [--sizes 100,1000,5000] [--url https://en.wikipedia.org/wiki/Web_browser]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from clawfox._content import (  # noqa: E402
+    HAS_MARKDOWNIFY,
+    INTERACTIVE_ELEMENTS_JS,
+    PAGE_MARKDOWN_JS,
+    build_go_output,
+    build_markdown_output,
+)
+from clawfox._paths import DEFAULT_MAX_ELEMENTS  # noqa: E402
+
+_SECTION = """
+<section>
+  <h2>Section {i}</h2>
+  <p>Lorem ipsum <b>dolor</b> sit amet, <a href="/page/{i}">consectetur</a> adipiscing elit, sed do eiusmod
+  tempor incididunt ut labore et <em>dolore</em> magna aliqua.</p>
+  <ul><li>alpha {i}</li><li>beta <a href="/beta/{i}">link</a></li><li>gamma</li></ul>
+  <table><tr><th>key</th><th>value</th></tr><tr><td>{i}</td><td><button id="b{i}">Go</button></td></tr></table>
+  <form><input name="q{i}"> <button>Search</button></form>
+  <script>var x{i} = {i};</script>
+</section>
+"""
+
+
+def synthetic_page(kb: int) -> str:
+    """HTML of roughly kb kilobytes made of repeated article sections with links, lists, tables and forms."""
+    parts, size, i = ["<html><head><title>bench</title></head><body><h1>clawfox bench</h1>"], 0, 0
+    while size < kb * 1024:
+        section = _SECTION.format(i=i)
+        parts.append(section)
+        size += len(section)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+async def _python_path(page) -> tuple[str, int]:
+    html = await page.content()
+    elements = await page.evaluate(INTERACTIVE_ELEMENTS_JS, {"limit": DEFAULT_MAX_ELEMENTS})
+    out = await asyncio.to_thread(build_go_output, html, elements["elements"], False)
+    return out, len(html) + len(json.dumps(elements))
+
+
+async def _page_path(page) -> tuple[str, int]:
+    snapshot = await page.evaluate(PAGE_MARKDOWN_JS, {"limit": DEFAULT_MAX_ELEMENTS})
+    out = build_markdown_output(snapshot["markdown"], snapshot["elements"], snapshot["total"])
+    return out, len(json.dumps(snapshot))
+
+
+async def _time(fn, page, runs: int) -> tuple[float, int, int]:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out, transferred = await fn(page)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), transferred, len(out)
+
+
+async def main_async(runs: int, sizes: list[int], urls: list[str]):
+    if not HAS_MARKDOWNIFY:
+        print("note: markdownify is not installed; the python path uses the plain-text fallback\n")
+    print(f"{'page':32s} {'converter':9s} {'ms (median)':>12s} {'transferred KB':>15s} {'output KB':>10s}")
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        page = await browser.new_page()
+        targets = [(f"synthetic {kb} KB", kb) for kb in sizes] + [(u[:32], u) for u in urls]
+        for label, target in targets:
+            if isinstance(target, int):
+                await page.set_content(synthetic_page(target), wait_until="domcontentloaded")
+            else:
+                await page.goto(target, wait_until="domcontentloaded")
+            for name, fn in (("python", _python_path), ("page", _page_path)):
+                ms, transferred, out_len = await _time(fn, page, runs)
+                print(f"{label:32s} {name:9s} {ms:12.1f} {transferred / 1024:15.0f} {out_len / 1024:10.0f}")
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Conversions per page and converter (default 5)")
+    parser.add_argument("--sizes", default="100,1000,5000", help="Synthetic page sizes in KB (comma-separated)")
+    parser.add_argument("--url", action="append", default=[], help="Also measure this page (repeatable)")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    asyncio.run(main_async(args.runs, sizes, args.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Interactive element enumeration on pages with tens of thousands of elements.
+
+Loads synthetic pages with N interactive elements (links in long nav lists, buttons, inputs, ARIA widgets, hidden
+controls and custom elements with open shadow roots) into one headless Chromium, scrolled part-way down, and times:
+
+- legacy: the previous enumerator (one describe per element, offsetParent/offsetWidth and textContent each, every
+  element returned)
+- first page: INTERACTIVE_ELEMENTS_JS with the default cap (what go/show list)
+- last page: the same cap at the last offset (clawfox elements --offset ...)
+- all: INTERACTIVE_ELEMENTS_JS with no cap
+
+Reports the median evaluate time and the JSON size returned to Python.
+
+    python bench/bench_elements.py [--runs 5] [--sizes 1000,10000,50000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from clawfox._content import INTERACTIVE_ELEMENTS_JS  # noqa: E402
+from clawfox._paths import DEFAULT_MAX_ELEMENTS  # noqa: E402
+
+# The enumerator before the batched, capped rewrite, kept as the baseline
+LEGACY_ELEMENTS_JS = """
+() => {
+  const describe = (el) => {
+    const tag = el.tagName.toLowerCase();
+    const id = el.id ? `#${el.id}` : null;
+    const name = el.name && (el.tagName === 'INPUT' || el.tagName === 'BUTTON') ? `[name="${el.name}"]` : null;
+    let suggested = id || name || null;
+    if (!suggested && tag === 'button') {
+      const t = (el.textContent || '').trim().slice(0, 50);
+      if (t) suggested = `role=button[name="${t}"]`;
+    }
+    if (!suggested && tag === 'a' && el.textContent) {
+      const t = (el.textContent || '').trim().slice(0, 50);
+      if (t) suggested = `text=${JSON.stringify(t)}`;
+    }
+    if (!suggested) suggested = tag + (el.className ? '.' + String(el.className).split(/\\s+/)[0] : '');
+    const href = el.getAttribute('href');
+    const visible = el.offsetParent !== null && (el.offsetWidth > 0 || el.offsetHeight > 0);
+    return { tag, id: el.id || null, name: el.name || null, suggested, href: href || null, visible, text: (el.textContent || '').trim().slice(0, 80) };
+  };
+  return Array.from(document.querySelectorAll('a[href], button, input, [role="button"], [onclick]'), describe);
+}
+"""
+
+_BLOCK = """
+<section>
+  <h2>Block {i}</h2>
+  <ul class="nav">{links}</ul>
+  <p>Some text with an <a href="/inline/{i}">inline link</a> and a <button class="btn">Action {i}</button>.</p>
+  <form><input name="q{i}"> <input type="checkbox" name="c{i}"> <select name="s{i}"><option>a</option></select></form>
+  <div role="button" tabindex="0">Custom {i}</div> <span role="tab">Tab {i}</span>
+  <div style="display:none"><button>Hidden {i}</button><a href="/hidden/{i}">hidden</a></div>
+  <x-card data-i="{i}"></x-card>
+</section>
+"""
+_PER_BLOCK = 20 + 9  # links in the nav list + the other interactive elements (x-card adds one in its shadow root)
+
+_SHADOW_SCRIPT = """
+<script>
+customElements.define('x-card', class extends HTMLElement {
+  connectedCallback() {
+    this.attachShadow({ mode: 'open' }).innerHTML = `<button>Open card ${this.dataset.i}</button>`;
+  }
+});
+</script>
+"""
+
+
+def synthetic_page(elements: int) -> str:
+    """HTML with about this many interactive elements."""
+    parts = ["<html><head><title>elements bench</title>", _SHADOW_SCRIPT, "</head><body>"]
+    for i in range(max(elements // _PER_BLOCK, 1)):
+        links = "".join(f'<li><a href="/nav/{i}/{j}">Link {i}.{j}</a></li>' for j in range(20))
+        parts.append(_BLOCK.format(i=i, links=links))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+async def _time(page, js: str, arg, runs: int) -> tuple[float, int, int]:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = await page.evaluate(js, arg)
+        times.append((time.perf_counter() - t0) * 1000)
+    count = len(result) if isinstance(result, list) else len(result["elements"])
+    return statistics.median(times), len(json.dumps(result)), count
+
+
+async def main_async(runs: int, sizes: list[int]):
+    print(f"{'page':22s} {'enumerator':12s} {'ms (median)':>12s} {'returned KB':>12s} {'elements':>9s}")
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        page = await browser.new_page(viewport={"width": 1280, "height": 720})
+        for size in sizes:
+            await page.set_content(synthetic_page(size), wait_until="load")
+            await page.evaluate("() => window.scrollTo(0, document.documentElement.scrollHeight / 3)")
+            total = (await page.evaluate(INTERACTIVE_ELEMENTS_JS, {"limit": 0}))["total"]
+            label = f"{total} elements"
+            last = max(total - DEFAULT_MAX_ELEMENTS, 0)
+            cases = (
+                ("legacy", LEGACY_ELEMENTS_JS, None),
+                ("first page", INTERACTIVE_ELEMENTS_JS, {"limit": DEFAULT_MAX_ELEMENTS}),
+                ("last page", INTERACTIVE_ELEMENTS_JS, {"offset": last, "limit": DEFAULT_MAX_ELEMENTS}),
+                ("all", INTERACTIVE_ELEMENTS_JS, {}),
+            )
+            for name, js, arg in cases:
+                ms, size_bytes, count = await _time(page, js, arg, runs)
+                print(f"{label:22s} {name:12s} {ms:12.1f} {size_bytes / 1024:12.0f} {count:9d}")
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Enumerations per page and enumerator (default 5)")
+    parser.add_argument(
+        "--sizes", default="1000,10000,50000", help="Interactive elements per synthetic page (comma-separated)"
+    )
+    args = parser.parse_args()
+    asyncio.run(main_async(args.runs, [int(s) for s in args.sizes.split(",") if s]))
+
+
+if __name__ == "__main__":
+    main()
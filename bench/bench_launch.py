@@ -0,0 +1,64 @@
+"""Launch time and memory of each Chromium launch profile.
+
+For every profile: launch a persistent context in a throwaway profile dir (as the daemon does), open a page,
+load URL (default: a small data: page), then report time to ready and the RSS of the browser process tree.
+
+    python bench/bench_launch.py [--runs 3] [--url https://example.com] [--profiles default,low-memory]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from clawfox._launch import LAUNCH_PROFILES, launch_options, process_tree_rss  # noqa: E402
+
+DEFAULT_URL = "data:text/html,<title>bench</title><h1>clawfox</h1>" + "<p>lorem ipsum</p>" * 200
+
+
+async def _one_run(profile: str, url: str) -> tuple[float, int | None]:
+    async with async_playwright() as p:
+        with tempfile.TemporaryDirectory() as profile_dir:
+            t0 = time.perf_counter()
+            context = await p.chromium.launch_persistent_context(profile_dir, **launch_options(profile))
+            page = context.pages[0] if context.pages else await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded")
+            ready_ms = (time.perf_counter() - t0) * 1000
+            await asyncio.sleep(1)  # let helper processes settle before sampling memory
+            rss = process_tree_rss()
+            await context.close()
+    return ready_ms, rss
+
+
+async def main_async(profiles: list[str], runs: int, url: str):
+    print(f"{'profile':12s} {'ready ms (median)':>18s} {'tree RSS MB (median)':>22s}")
+    for profile in profiles:
+        times, rss = [], []
+        for _ in range(runs):
+            ready_ms, tree_rss = await _one_run(profile, url)
+            times.append(ready_ms)
+            if tree_rss is not None:
+                rss.append(tree_rss / 1e6)
+        rss_s = f"{statistics.median(rss):.0f}" if rss else "n/a"
+        print(f"{profile:12s} {statistics.median(times):18.0f} {rss_s:>22s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Launches per profile (default 3)")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Page to load before measuring")
+    parser.add_argument("--profiles", default=",".join(LAUNCH_PROFILES), help="Comma-separated profiles")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.profiles.split(","), args.runs, args.url))
+
+
+if __name__ == "__main__":
+    main()
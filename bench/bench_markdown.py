@@ -0,0 +1,154 @@
+"""HTML-to-markdown converters on large documents: the built-in streaming converter vs markdownify.
+
+Builds a synthetic corpus (article text, navigation, link lists, tables, forms, inline scripts and styles) at each
+size, or reads --file documents, and reports for each converter the median wall time and the peak Python
+allocation (tracemalloc, measured in a separate run so it does not skew the timing). "builtin 50k" is the
+built-in converter with a 50,000-char output budget, which stops parsing early.
+
+--check converts the regression cases in bench/markdown_cases (NAME.html, expected output in NAME.md) with the
+built-in converter instead, and exits non-zero if any output differs.
+
+    python bench/bench_markdown.py [--sizes 1,5,10,20] [--runs 3] [--file page.html ...] [--write-corpus DIR]
+    python bench/bench_markdown.py --check
+"""
+from __future__ import annotations
+
+import argparse
+import difflib
+import glob
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CASES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "markdown_cases")
+
+from clawfox import _markdown  # noqa: E402
+from clawfox._content import HAS_MARKDOWNIFY, html_to_markdown  # noqa: E402
+
+_WORDS = (
+    "browser agent page markdown selector element network cookie session render layout script style table form "
+    "input button link heading list item content navigation footer banner article section"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 24))]
+    return " ".join(words).capitalize() + "."
+
+
+def _section(rng: random.Random, i: int) -> str:
+    paras = "".join(
+        f"<p>{_sentence(rng)} <a href=\"/doc/{i}/{j}\">{rng.choice(_WORDS)}</a> <b>{rng.choice(_WORDS)}</b> "
+        f"{_sentence(rng)} <em>{rng.choice(_WORDS)}</em> {_sentence(rng)}</p>"
+        for j in range(rng.randint(2, 5))
+    )
+    nav = "".join(f'<li><a href="/nav/{i}/{j}">{rng.choice(_WORDS)}</a></li>' for j in range(10))
+    rows = "".join(
+        f"<tr><td>{j}</td><td>{rng.choice(_WORDS)}</td><td><a href=\"/row/{j}\">{_sentence(rng)}</a></td></tr>"
+        for j in range(rng.randint(3, 8))
+    )
+    return (
+        f'<div class="section" id="s{i}"><nav><ul>{nav}</ul></nav>'
+        f"<article><h2>Section {i}: {rng.choice(_WORDS)}</h2>{paras}"
+        f"<ol><li>{_sentence(rng)}</li><li>{_sentence(rng)}<ul><li>{_sentence(rng)}</li></ul></li></ol>"
+        f"<table><thead><tr><th>#</th><th>name</th><th>detail</th></tr></thead><tbody>{rows}</tbody></table>"
+        f"<pre><code>for (let i = 0; i &lt; {i}; i++) {{ render(i); }}</code></pre></article>"
+        f'<form action="/search"><input name="q{i}" placeholder="Search"><select name="o{i}"><option>one'
+        f"<option>two</select><button>Go</button></form>"
+        f"<script>window.data{i} = {[rng.random() for _ in range(20)]};</script>"
+        f"<style>.section{i} {{ color: #{i % 4096:03x}; }}</style></div>\n"
+    )
+
+
+def synthetic_document(mb: float, seed: int = 0) -> str:
+    """Deterministic HTML document of about mb megabytes."""
+    rng = random.Random(seed)
+    parts = ["<!doctype html><html><head><title>corpus</title></head><body><h1>Corpus</h1>"]
+    size, i = 0, 0
+    while size < mb * 1_000_000:
+        section = _section(rng, i)
+        parts.append(section)
+        size += len(section)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _converters() -> dict:
+    out = {
+        "builtin": lambda html: _markdown.convert(html)[0],
+        "builtin 50k": lambda html: _markdown.convert(html, max_chars=50_000)[0],
+    }
+    if HAS_MARKDOWNIFY:
+        out["markdownify"] = html_to_markdown
+    return out
+
+
+def _measure(fn, html: str, runs: int) -> tuple[float, float, int]:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn(html)
+        times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak / 1e6, len(out)
+
+
+def check_cases() -> int:
+    """Convert each regression case and diff it against its expected markdown. Returns the number that differ."""
+    failed = 0
+    for html_path in sorted(glob.glob(os.path.join(CASES_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(html_path))[0]
+        with open(html_path, encoding="utf-8") as f:
+            got = _markdown.convert(f.read())[0]
+        with open(os.path.join(CASES_DIR, name + ".md"), encoding="utf-8") as f:
+            want = f.read().rstrip("\n")
+        if got == want:
+            print(f"ok    {name}")
+            continue
+        failed += 1
+        print(f"FAIL  {name}")
+        diff = difflib.unified_diff(want.splitlines(), got.splitlines(), "expected", "builtin", lineterm="")
+        print("\n".join(f"      {line}" for line in diff))
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,5,10,20", help="Synthetic document sizes in MB (comma-separated)")
+    parser.add_argument("--runs", type=int, default=3, help="Timed conversions per document and converter")
+    parser.add_argument("--file", action="append", default=[], help="Also convert this HTML file (repeatable)")
+    parser.add_argument("--write-corpus", metavar="DIR", help="Save the synthetic documents to DIR")
+    parser.add_argument("--check", action="store_true", help="Check the regression cases instead of timing")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(1 if check_cases() else 0)
+
+    docs = [(f"synthetic {s} MB", synthetic_document(float(s))) for s in args.sizes.split(",") if s]
+    for path in args.file:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            docs.append((os.path.basename(path)[:24], f.read()))
+    if args.write_corpus:
+        os.makedirs(args.write_corpus, exist_ok=True)
+        for label, html in docs:
+            with open(os.path.join(args.write_corpus, label.replace(" ", "_") + ".html"), "w") as f:
+                f.write(html)
+    if not HAS_MARKDOWNIFY:
+        print("note: markdownify is not installed; only the built-in converter is measured\n")
+
+    print(f"{'document':24s} {'converter':12s} {'ms (median)':>12s} {'peak MB':>9s} {'output KB':>10s}")
+    for label, html in docs:
+        for name, fn in _converters().items():
+            ms, peak, out_len = _measure(fn, html, args.runs)
+            print(f"{label:24s} {name:12s} {ms:12.0f} {peak:9.1f} {out_len / 1024:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
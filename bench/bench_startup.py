@@ -0,0 +1,95 @@
+"""Measure per-command client overhead of the clawfox CLI.
+
+Startup (no daemon needed): time a fresh interpreter importing the CLI module, and the same with the daemon
+module (Playwright + markdownify) imported too, which is what every command paid when __main__ imported
+_daemon eagerly. Also reports whether any heavy module leaks into the client path.
+
+Live (--live N, uses the running daemon or starts one): time N separate 'clawfox url' processes against N 'url'
+requests over one persistent connection.
+
+    python bench/bench_startup.py [--runs 20] [--live 20]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("playwright", "markdownify", "bs4", "importlib.metadata", "clawfox._daemon", "clawfox._content")
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+{imports}
+t1 = time.perf_counter()
+print(json.dumps({{"ms": (t1 - t0) * 1000, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def _probe(imports: str, runs: int) -> dict | None:
+    code = PROBE.format(imports=imports, heavy=HEAVY)
+    import_ms, wall_ms, heavy = [], [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+        wall_ms.append((time.perf_counter() - t0) * 1000)
+        if proc.returncode != 0:
+            return None
+        out = json.loads(proc.stdout)
+        import_ms.append(out["ms"])
+        heavy = out["heavy"]
+    return {"import_ms": statistics.median(import_ms), "process_ms": statistics.median(wall_ms), "heavy": heavy}
+
+
+def bench_startup(runs: int):
+    rows = [
+        ("client (lazy)", "import clawfox.__main__"),
+        ("client + daemon (eager)", "import clawfox.__main__, clawfox._daemon"),
+    ]
+    print(f"Interpreter start + import, median of {runs} runs")
+    for label, imports in rows:
+        res = _probe(imports, runs)
+        if res is None:
+            print(f"  {label:26s} skipped (import failed; is Playwright installed?)")
+            continue
+        heavy = ", ".join(res["heavy"]) or "none"
+        print(f"  {label:26s} import {res['import_ms']:7.1f} ms   process {res['process_ms']:7.1f} ms   heavy: {heavy}")
+
+
+def bench_live(n: int):
+    sys.path.insert(0, ROOT)
+    from clawfox import _client
+
+    _client.send_command("url")  # make sure the daemon is up before timing
+    t0 = time.perf_counter()
+    for _ in range(n):
+        subprocess.run([sys.executable, "-m", "clawfox", "url"], capture_output=True, check=True, cwd=ROOT)
+    per_process = (time.perf_counter() - t0) * 1000 / n
+
+    with _client.Connection() as conn:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            conn.call("url")
+        per_request = (time.perf_counter() - t0) * 1000 / n
+    print(f"'url' x {n}")
+    print(f"  one process per command   {per_process:7.1f} ms/command")
+    print(f"  one shared connection     {per_request:7.1f} ms/command")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Interpreter starts per variant (default 20)")
+    parser.add_argument("--live", type=int, default=0, metavar="N", help="Also time N commands against the daemon")
+    args = parser.parse_args()
+    bench_startup(args.runs)
+    if args.live:
+        bench_live(args.live)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,18 @@
 from __future__ import annotations
 
 import argparse
+import json
 import os
+import queue
+import shlex
 import sys
+import threading
 
+# Only the client is imported up front: Playwright and markdownify (via _daemon/_content) are loaded by the
+# daemon subcommand alone, so ordinary commands start fast.
 from . import _client
-from . import _daemon
+from ._launch import LAUNCH_PROFILES
+from ._paths import BLOCKABLE_RESOURCES, SCREENSHOT_FORMATS, SCREENSHOT_POLICIES
 
 
 HELP_EPILOG = """
@@ -19,6 +26,8 @@ Selectors (used by click, type, fill, wait, select):
     #login-form              element id
     input[name=email]        CSS: input with name="email"
     [data-testid=submit]     attribute selector
+    @17                      element ref from the last element list (go, show, elements); fastest, and
+                             unambiguous, until the page navigates
   If a selector fails, use "clawfox select SELECTOR" to see what it matches (count, tags, visibility).
 
 Typical workflow:
@@ -28,16 +37,35 @@ Typical workflow:
   clawfox fill 'input[name=password]' mypassword
   clawfox click 'role=button[name="Log in"]'
   clawfox show                      # dump current page again without navigating
-  clawfox screenshot               # take screenshot; prints path to PNG
+  clawfox screenshot               # take screenshot; prints path to image file (PNG by default; see --format)
   clawfox stop                     # shut down the daemon (otherwise it runs until you stop it)
+
+Many commands in a row: "clawfox shell" reads one command per line from stdin and sends them all
+over a single daemon connection (e.g. clawfox shell < steps.txt). "clawfox run steps.txt" goes further
+and runs the whole script inside the daemon in one request, printing each step's output and timing.
 """
 
 
-def main():
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def _quality(value: str) -> int:
+    number = int(value)
+    if not 0 <= number <= 100:
+        raise argparse.ArgumentTypeError(f"must be 0-100, got {number}")
+    return number
+
+
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="clawfox",
         description="CLI headless browser (Playwright). Controls a long-lived browser in the background; "
-        "the daemon starts automatically on first use. All commands use one shared page.",
+        "the daemon starts automatically on first use. All commands use one shared page unless --session "
+        "picks a separate, isolated session.",
         epilog=HELP_EPILOG,
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
@@ -46,8 +74,65 @@ def main():
         action="store_true",
         help="Run browser with a visible window (so you can log in). Use before first command, or run 'clawfox stop' then retry with --headful.",
     )
+    parser.add_argument(
+        "--launch-profile",
+        choices=tuple(LAUNCH_PROFILES),
+        help="Chromium launch profile used when the daemon starts: fast-start (fewer background services) or "
+        "low-memory (also caps renderer processes and cache). Can also be set with CLAWFOX_LAUNCH_PROFILE.",
+    )
+    parser.add_argument(
+        "--session",
+        metavar="NAME",
+        help="Use the named browser session (its own cookies, tabs and current page) instead of the default one. "
+        "Sessions are created on first use. Can also be set with CLAWFOX_SESSION.",
+    )
     sub = parser.add_subparsers(dest="cmd", required=True)
 
+    def add_screenshot_policy(p):
+        p.add_argument(
+            "--screenshot",
+            choices=SCREENSHOT_POLICIES + ("off",),
+            help="Screenshot after the output: sync (before replying), async (path now, file written in the "
+            "background) or on-demand/off (none). Default: CLAWFOX_SCREENSHOTS, else async",
+        )
+
+    def add_main(p):
+        p.add_argument(
+            "--main",
+            action="store_true",
+            help="Reader mode: only the main content (no navigation, footers or banners) and its elements",
+        )
+
+    def add_block_types(p):
+        p.add_argument(
+            "--block",
+            metavar="TYPES",
+            help=f"Block these resource types while this command loads ({','.join(BLOCKABLE_RESOURCES)}, "
+            "comma-separated, or none); replaces the session's 'block' list for this command",
+        )
+
+    def add_ax(p):
+        p.add_argument(
+            "--ax",
+            action="store_true",
+            help="Accessibility-tree outline (roles, names, states) instead of markdown; elements as role= selectors",
+        )
+
+    def add_budget(p):
+        group = p.add_mutually_exclusive_group()
+        group.add_argument(
+            "--max-chars", type=_positive_int, metavar="N", help="Print at most N chars; the rest is kept for 'show --page'"
+        )
+        group.add_argument(
+            "--max-tokens", type=_positive_int, metavar="N", help="Like --max-chars, for about N tokens (4 chars each)"
+        )
+        p.add_argument(
+            "--truncate",
+            action="store_true",
+            help="With --max-chars/--max-tokens, cut the output there instead of paging it (with "
+            "CLAWFOX_CONVERTER=builtin, faster on long pages: the page is only converted up to the budget)",
+        )
+
     def add_go():
         p = sub.add_parser(
             "go",
@@ -59,6 +144,11 @@ def main():
         p.add_argument("url", help="URL to open (e.g. https://example.com)")
         p.add_argument("--html", action="store_true", help="Output HTML instead of markdown")
         p.add_argument("--timeout", type=int, default=30, help="Load timeout in seconds (default 30)")
+        add_block_types(p)
+        add_main(p)
+        add_ax(p)
+        add_budget(p)
+        add_screenshot_policy(p)
         return p
 
     def add_show():
@@ -69,6 +159,19 @@ def main():
             "but for the page already open. Use after 'go', 'click', 'back', etc. to re-dump the current state.",
         )
         p.add_argument("--html", action="store_true", help="Output HTML instead of markdown")
+        p.add_argument(
+            "--diff", action="store_true", help="Only blocks and elements changed since this tab's last output"
+        )
+        p.add_argument(
+            "--page",
+            type=_positive_int,
+            metavar="N",
+            help="Print page N of this tab's last output (as split by --max-chars/--max-tokens) without re-reading it",
+        )
+        add_main(p)
+        add_ax(p)
+        add_budget(p)
+        add_screenshot_policy(p)
         return p
 
     def add_eval():
@@ -85,9 +188,29 @@ def main():
         p = sub.add_parser(
             "screenshot",
             help="Take a screenshot and print its file path",
-            description="Capture the current page to a new PNG file in ~/.clawfox/screenshots/ with a "
-            "timestamp in the name. Prints the full path. No path argument; use the printed path to open or attach.",
+            description="Capture the current page to a new image file (PNG by default; see --format) in "
+            "~/.clawfox/screenshots/ with a timestamp in the name. Prints the full path. No path argument; use the "
+            "printed path to open or attach. The --format/--quality/--max-width defaults "
+            "(CLAWFOX_SCREENSHOT_FORMAT, _QUALITY, _MAX_WIDTH) also apply to the screenshots taken after go, show, "
+            "click, etc.",
         )
+        p.add_argument("--format", choices=SCREENSHOT_FORMATS, help="Image format (default png); jpeg/webp are smaller")
+        p.add_argument("--quality", type=_quality, metavar="N", help="JPEG/WebP quality 0-100")
+        p.add_argument("--full-page", action="store_true", help="Capture the whole scrollable page, not the viewport")
+        p.add_argument("--selector", help="Capture only the first element matching this Playwright selector")
+        p.add_argument("--max-width", type=_positive_int, metavar="W", help="Scale down so the image is at most W pixels wide")
+        return p
+
+    def add_elements():
+        p = sub.add_parser(
+            "elements",
+            help="List the page's interactive elements, a page at a time",
+            description="Print the interactive elements (links, buttons, inputs, ARIA widgets, including inside "
+            "shadow roots) with suggested selectors, viewport first. go/show list the first "
+            "CLAWFOX_MAX_ELEMENTS (default 200); use --offset to see the rest.",
+        )
+        p.add_argument("--offset", type=int, default=0, help="Skip this many elements (default 0)")
+        p.add_argument("--limit", type=int, metavar="N", help="List at most N (default CLAWFOX_MAX_ELEMENTS, 200)")
         return p
 
     def add_click():
@@ -98,8 +221,14 @@ def main():
             "for load and then prints the new page content (same format as 'go'). Use 'clawfox select SELECTOR' "
             "if the selector doesn't match what you expect.",
         )
-        p.add_argument("selector", help="Playwright selector (e.g. role=button[name='Submit'], text=Next)")
+        p.add_argument(
+            "selector", help="Playwright selector or element ref (e.g. @17, role=button[name='Submit'], text=Next)"
+        )
         p.add_argument("--timeout", type=int, default=10, help="Wait up to this many seconds for element (default 10)")
+        p.add_argument(
+            "--diff", action="store_true", help="Print only what changed on the page instead of the whole page"
+        )
+        add_screenshot_policy(p)
         return p
 
     def add_select():
@@ -122,7 +251,9 @@ def main():
             "react to key events. For simple value setting, 'fill' is faster. Pass text as separate words; "
             "they are joined with spaces.",
         )
-        p.add_argument("selector", help="Playwright selector (e.g. input[name=search], role=textbox)")
+        p.add_argument(
+            "selector", help="Playwright selector or element ref (e.g. @4, input[name=search], role=textbox)"
+        )
         p.add_argument("text", nargs="+", help="Text to type (multiple words joined with spaces)")
         p.add_argument("--timeout", type=int, default=10, help="Wait up to this many seconds for element (default 10)")
         return p
@@ -134,7 +265,7 @@ def main():
             description="Set the value of the element directly (no key events). Use for text fields, search boxes, "
             "etc. Pass value as separate words; they are joined with spaces.",
         )
-        p.add_argument("selector", help="Playwright selector (e.g. input[name=email])")
+        p.add_argument("selector", help="Playwright selector or element ref (e.g. @4, input[name=email])")
         p.add_argument("text", nargs="+", help="Value to set (multiple words joined with spaces)")
         p.add_argument("--timeout", type=int, default=10, help="Wait up to this many seconds for element (default 10)")
         return p
@@ -158,21 +289,56 @@ def main():
     def add_back():
         p = sub.add_parser("back", help="Browser Back button")
         p.description = "Go back one page in history, then print the new page content (same format as 'go')."
+        add_screenshot_policy(p)
         return p
 
     def add_forward():
         p = sub.add_parser("forward", help="Browser Forward button")
         p.description = "Go forward one page in history, then print the new page content."
+        add_screenshot_policy(p)
         return p
 
     def add_reload():
         p = sub.add_parser("reload", help="Reload the current page")
         p.description = "Reload the page, wait for load, then print the new content."
+        add_block_types(p)
+        add_screenshot_policy(p)
         return p
 
     def add_daemon():
         p = sub.add_parser("daemon", help="Start the daemon (blocking)")
-        p.description = "Start the browser daemon and accept commands. Usually you don't run this yourself; any other command will start the daemon automatically if it isn't running."
+        p.description = (
+            "Start the browser daemon and accept commands. Usually you don't run this yourself; any other command "
+            "will start the daemon automatically if it isn't running. With --max-workers above 1, a router process "
+            "owns the socket and spreads sessions across a pool of worker daemons, each with its own browser."
+        )
+        p.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Worker daemons to keep running (default 1, or CLAWFOX_WORKERS)",
+        )
+        p.add_argument(
+            "--max-workers",
+            type=int,
+            default=None,
+            help="Grow the pool up to this many workers when all are busy (default: --workers, or CLAWFOX_MAX_WORKERS)",
+        )
+        p.add_argument(
+            "--idle-minutes",
+            type=float,
+            default=None,
+            help="Release the browser after this many minutes without commands; the next command relaunches it "
+            "and reopens the tabs (default 30, or CLAWFOX_IDLE_MINUTES; 0 = never)",
+        )
+        p.add_argument(
+            "--screenshots",
+            choices=SCREENSHOT_POLICIES + ("off",),
+            default=None,
+            help="Default screenshot policy for page commands (sync, async, on-demand/off; or CLAWFOX_SCREENSHOTS)",
+        )
+        p.add_argument("--worker-socket", help=argparse.SUPPRESS)
+        p.add_argument("--worker-index", type=int, default=0, help=argparse.SUPPRESS)
         return p
 
     def add_stop():
@@ -191,10 +357,60 @@ def main():
         p.description = "Find a tab whose URL contains the given string, bring it to front, and use it for future commands."
         return p
 
+    def add_block():
+        p = sub.add_parser("block", help="Block images, fonts, media, stylesheets or ads for this session")
+        p.description = (
+            "Set the resource types the session's pages do not load (e.g. 'clawfox block images,fonts,media'; "
+            "'clawfox block none' to load everything), or with no argument show the list. Also prints how many "
+            "requests have been blocked and an estimate of the bytes saved. 'ads' blocks requests to the domains "
+            "on the EasyList-style or hosts-file lists in ~/.clawfox/blocklists/ (or CLAWFOX_BLOCKLISTS), and "
+            "the output then includes the lists' hit rate. CLAWFOX_BLOCK sets the list for new sessions; "
+            "go/reload --block override it for one command."
+        )
+        p.add_argument("types", nargs="?", help=f"Comma-separated: {', '.join(BLOCKABLE_RESOURCES)}, or none")
+        return p
+
+    def add_sessions():
+        p = sub.add_parser("sessions", help="List open browser sessions")
+        p.description = "List every open session with its tab count and current URL. Select a session with --session NAME."
+        return p
+
+    def add_close_session():
+        p = sub.add_parser("close_session", help="Close the session given by --session")
+        p.description = (
+            "Close the browser context of the session named by --session (or CLAWFOX_SESSION). Its cookies and "
+            "storage are saved and restored the next time the session is used. The default session cannot be closed."
+        )
+        return p
+
+    def add_shell():
+        p = sub.add_parser("shell", help="Read commands from stdin over one daemon connection")
+        p.description = (
+            "Interactive prompt (or script on stdin): one clawfox command per line, without the leading "
+            "'clawfox', e.g. 'go https://example.com'. All commands share one connection to the daemon, so "
+            "there is no per-command process start or reconnect. When stdin is not a terminal, commands are "
+            "pipelined. Blank lines and lines starting with # are ignored."
+        )
+        return p
+
+    def add_run():
+        p = sub.add_parser("run", help="Run a script of commands in one daemon request")
+        p.description = (
+            "Read commands from FILE (or stdin), one per line in shell syntax without the leading 'clawfox' "
+            "(e.g. 'go https://example.com', 'fill input[name=q] hello', 'show'), and run them all inside the "
+            "daemon in a single request. Prints each step's output with its timing. Stops at the first failing "
+            "step unless --keep-going. Exit status is non-zero if any step failed."
+        )
+        p.add_argument("file", nargs="?", default="-", help="Script file (default: stdin)")
+        p.add_argument("--keep-going", action="store_true", help="Run remaining steps after a failure")
+        p.add_argument("--json", action="store_true", help="Print per-step results as JSON")
+        return p
+
     add_go()
     add_show()
     add_eval()
     add_screenshot()
+    add_elements()
     add_click()
     add_select()
     add_type()
@@ -208,41 +424,278 @@ def main():
     add_stop()
     add_tabs()
     add_focus_tab()
+    add_block()
+    add_sessions()
+    add_close_session()
+    add_shell()
+    add_run()
+    return parser
 
-    args = parser.parse_args()
 
-    if getattr(args, "headful", False):
-        os.environ["CLAWFOX_HEADFUL"] = "1"
-
-    if args.cmd == "daemon":
-        _daemon.run_daemon()
-        return
-
-    # Build kwargs for send_command
+def _command_kwargs(args) -> dict:
+    """Build the daemon request args for a parsed command."""
     kwargs = {}
     if args.cmd == "go":
         kwargs["url"] = args.url
         kwargs["html"] = args.html
         kwargs["timeout_ms"] = args.timeout * 1000
+        kwargs["main"] = args.main
+        kwargs["ax"] = args.ax
+        kwargs["max_chars"] = args.max_chars
+        kwargs["max_tokens"] = args.max_tokens
+        kwargs["truncate"] = args.truncate
     elif args.cmd == "show":
         kwargs["html"] = args.html
+        kwargs["diff"] = args.diff
+        kwargs["page_number"] = args.page
+        kwargs["main"] = args.main
+        kwargs["ax"] = args.ax
+        kwargs["max_chars"] = args.max_chars
+        kwargs["max_tokens"] = args.max_tokens
+        kwargs["truncate"] = args.truncate
     elif args.cmd == "eval":
         kwargs["js"] = args.js
+    elif args.cmd == "screenshot":
+        kwargs["format"] = args.format
+        kwargs["quality"] = args.quality
+        kwargs["full_page"] = args.full_page
+        kwargs["selector"] = args.selector
+        kwargs["max_width"] = args.max_width
+    elif args.cmd == "elements":
+        kwargs["offset"] = args.offset
+        kwargs["limit"] = args.limit
     elif args.cmd in ("click", "select", "type", "fill", "wait"):
         kwargs["selector"] = args.selector
         kwargs["timeout_ms"] = getattr(args, "timeout", 10) * 1000
         if args.cmd in ("type", "fill"):
             kwargs["text"] = " ".join(args.text) if isinstance(args.text, list) else args.text
+        if args.cmd == "click":
+            kwargs["diff"] = args.diff
     elif args.cmd == "focus_tab":
         kwargs["url_contains"] = getattr(args, "url_contains", "")
+    elif args.cmd == "block":
+        kwargs["types"] = args.types
+    if getattr(args, "screenshot", None):
+        kwargs["screenshot"] = args.screenshot
+    if getattr(args, "block", None) is not None:
+        kwargs["block"] = args.block
+    return kwargs
+
+
+def _parse_line(parser: argparse.ArgumentParser, line: str):
+    """Parse one shell line into (cmd, kwargs, session); session is the line's --session or None. Returns None for
+    blank/comment lines; raises ValueError if invalid."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    tokens = shlex.split(line)
+    if tokens[0] == "clawfox":
+        tokens = tokens[1:]
+    try:
+        args = parser.parse_args(tokens)
+    except SystemExit:
+        # argparse has already printed usage/error (or help) to stderr/stdout
+        raise ValueError(f"invalid command: {line}")
+    if args.cmd in ("daemon", "shell", "run"):
+        raise ValueError(f"{args.cmd} cannot be used inside a shell session or script")
+    return args.cmd, _command_kwargs(args), args.session
+
+
+def _print_response(resp: dict) -> bool:
+    """Print one daemon response; return True if it was ok."""
+    for note in resp.get("recycled") or []:
+        print(f"clawfox: recycled {note}", file=sys.stderr)
+    if resp.get("blocked"):
+        print(f"clawfox: blocked {resp['blocked']}", file=sys.stderr)
+    if not resp.get("ok"):
+        print(f"clawfox: {resp.get('error', 'unknown error')}", file=sys.stderr)
+        return False
+    out = resp.get("output", "")
+    if out:
+        print(out, end="" if out.endswith("\n") else "\n")
+    sys.stdout.flush()
+    return True
+
+
+def _shell(parser: argparse.ArgumentParser) -> int:
+    """Run commands from stdin over one persistent connection. Returns exit status."""
+    interactive = sys.stdin.isatty()
+    failed = False
+    try:
+        conn = _client.Connection()
+    except RuntimeError as e:
+        print(f"clawfox: {e}", file=sys.stderr)
+        return 1
+    with conn:
+        if interactive:
+            while True:
+                try:
+                    line = input("clawfox> ")
+                except EOFError:
+                    print()
+                    break
+                try:
+                    parsed = _parse_line(parser, line)
+                except ValueError as e:
+                    print(f"clawfox: {e}", file=sys.stderr)
+                    continue
+                if parsed is None:
+                    continue
+                cmd, kwargs, session = parsed
+                try:
+                    _print_response(conn.call(cmd, session, **kwargs))
+                except RuntimeError as e:
+                    print(f"clawfox: {e}", file=sys.stderr)
+                    return 1
+                if cmd == "stop":
+                    break
+            return 0
+
+        # Non-interactive: keep up to PIPELINE_DEPTH requests in flight. Responses come back in order and a reader
+        # thread prints each as soon as it arrives, so a caller that writes one line and waits for its answer (over a
+        # pipe it keeps open) gets it at once.
+        slots = threading.Semaphore(_client.PIPELINE_DEPTH)
+        sent: queue.Queue = queue.Queue()  # one entry per request sent, then None
+        state = {"failed": False, "error": None}
+
+        def read_responses():
+            while sent.get() is not None:
+                try:
+                    resp = conn.recv()
+                except RuntimeError as e:
+                    state["error"] = e
+                    slots.release()  # wake the sender if it is waiting for a slot
+                    return
+                state["failed"] = not _print_response(resp) or state["failed"]
+                slots.release()
+
+        reader = threading.Thread(target=read_responses, daemon=True)
+        reader.start()
+        try:
+            for line in sys.stdin:
+                try:
+                    parsed = _parse_line(parser, line)
+                except ValueError as e:
+                    print(f"clawfox: {e}", file=sys.stderr)
+                    failed = True
+                    continue
+                if parsed is None:
+                    continue
+                cmd, kwargs, session = parsed
+                slots.acquire()
+                if state["error"] is not None:
+                    break
+                conn.send(cmd, session, **kwargs)
+                sent.put(cmd)
+                if cmd == "stop":
+                    break
+        except RuntimeError as e:
+            state["error"] = e
+        sent.put(None)
+        reader.join()
+        if state["error"] is not None:
+            print(f"clawfox: {state['error']}", file=sys.stderr)
+            return 1
+    return 1 if failed or state["failed"] else 0
+
+
+def _run(parser: argparse.ArgumentParser, args) -> int:
+    """Send a whole script to the daemon as one 'run' request. Returns exit status."""
+    try:
+        if args.file == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(args.file) as f:
+                lines = f.read().splitlines()
+    except OSError as e:
+        print(f"clawfox: {e}", file=sys.stderr)
+        return 1
+    steps = []
+    for lineno, line in enumerate(lines, 1):
+        try:
+            parsed = _parse_line(parser, line)
+        except ValueError as e:
+            print(f"clawfox: line {lineno}: {e}", file=sys.stderr)
+            return 1
+        if parsed is None:
+            continue
+        cmd, kwargs, session = parsed
+        if session not in (None, os.environ.get("CLAWFOX_SESSION")):
+            # The whole script is one request, run by the daemon (or pool worker) holding the script's session
+            print(
+                f"clawfox: line {lineno}: --session cannot change session inside a script "
+                f"(use 'clawfox --session {session} run ...')",
+                file=sys.stderr,
+            )
+            return 1
+        steps.append({"cmd": cmd, "args": kwargs, "line": line.strip()})
+    try:
+        # No socket timeout: each step carries its own timeout inside the daemon
+        with _client.Connection(timeout=None) as conn:
+            resp = conn.call("run", steps=steps, keep_going=args.keep_going)
+    except RuntimeError as e:
+        print(f"clawfox: {e}", file=sys.stderr)
+        return 1
+    if not resp.get("ok"):
+        _print_response(resp)
+        return 1
+    if args.json:
+        print(json.dumps({"steps": resp.get("steps", []), "ms": resp.get("ms")}, indent=2))
+    else:
+        _print_response(resp)
+    return 1 if resp.get("failed") else 0
+
+
+def main():
+    parser = _build_parser()
+    args = parser.parse_args()
+
+    if getattr(args, "headful", False):
+        os.environ["CLAWFOX_HEADFUL"] = "1"
+    if getattr(args, "launch_profile", None):
+        os.environ["CLAWFOX_LAUNCH_PROFILE"] = args.launch_profile
+    if getattr(args, "session", None):
+        os.environ["CLAWFOX_SESSION"] = args.session
+
+    if args.cmd == "daemon":
+        # _daemon (Playwright, the converters) is imported only by processes that run a browser, not the router
+        if args.idle_minutes is not None:
+            os.environ["CLAWFOX_IDLE_MINUTES"] = str(args.idle_minutes)  # inherited by pool workers
+        if args.screenshots:
+            os.environ["CLAWFOX_SCREENSHOTS"] = args.screenshots
+
+        if args.worker_socket:
+            from . import _daemon
+
+            _daemon.run_daemon(args.worker_socket, pidfile_path=None, default_session=args.worker_index == 0)
+            return
+        workers = args.workers or int(os.environ.get("CLAWFOX_WORKERS") or "1")
+        max_workers = args.max_workers or int(os.environ.get("CLAWFOX_MAX_WORKERS", "0")) or workers
+        if max(workers, max_workers) > 1:
+            from . import _router
+
+            _router.run_router(workers, max_workers)
+            return
+        from . import _daemon
+
+        _daemon.run_daemon()
+        return
+
+    if args.cmd == "shell":
+        sys.exit(_shell(parser))
 
+    if args.cmd == "run":
+        sys.exit(_run(parser, args))
+
+    kwargs = _command_kwargs(args)
     try:
-        out = _client.send_command(args.cmd, **kwargs)
-        if out:
-            print(out, end="" if out.endswith("\n") else "\n")
+        with _client.Connection() as conn:
+            resp = conn.call(args.cmd, **kwargs)
     except RuntimeError as e:
         print(f"clawfox: {e}", file=sys.stderr)
         sys.exit(1)
+    if not _print_response(resp):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
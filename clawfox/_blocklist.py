@@ -0,0 +1,149 @@
+"""Ad and tracker domain blocklist: EasyList-style host rules and hosts files, indexed in a reversed-label trie.
+
+Lists are read from CLAWFOX_BLOCKLISTS (files separated by os.pathsep) or, by default, every file in
+~/.clawfox/blocklists/. Only rules that block a whole host are used: `||example.com^` (optionally `$third-party`),
+hosts-file lines (`0.0.0.0 example.com`) and bare domains. Cosmetic, exception and path rules are skipped. A listed
+domain also matches its subdomains, so a lookup walks the host's labels from the right and stops at the first listed
+one: its cost depends on the number of labels in the host, not on the size of the lists.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+from collections import Counter
+
+from ._paths import BLOCKLIST_DIR
+
+_END = ""  # key of a trie node's terminal flag (labels are never empty); value: listed for third-party requests only
+_HOSTS_ADDRESSES = {"0.0.0.0", "127.0.0.1", "::", "::0", "::1"}
+_IGNORED_HOSTS = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost", "ip6-loopback"}
+_DOMAIN_RE = re.compile(r"^(?=.{1,253}$)[a-z0-9_](?:[a-z0-9_-]*[a-z0-9_])?(?:\.[a-z0-9_](?:[a-z0-9_-]*[a-z0-9_])?)+$")
+_HOST_RULE_RE = re.compile(r"^\|\|([^/^$*|]+)\^(?:\$(.*))?$")
+_COMMENT_RE = re.compile(r"\s#")
+# Rule options that keep a ||host^ rule host-wide; any other option scopes it to request types or sites
+_HOST_WIDE_OPTIONS = {"third-party", "3p", "important", "all"}
+
+
+def parse_line(line: str) -> list[tuple[str, bool]]:
+    """(domain, third-party only) pairs a list line blocks; [] for comments and rules that are not host-wide."""
+    line = line.strip()
+    if not line or line[0] in "!#[":
+        return []
+    if line.startswith("||"):
+        match = _HOST_RULE_RE.match(line)
+        if match is None:
+            return []
+        options = set(match.group(2).split(",")) if match.group(2) else set()
+        if options - _HOST_WIDE_OPTIONS:
+            return []
+        entries = [(match.group(1), bool(options & {"third-party", "3p"}))]
+    else:
+        # Hosts-file comments follow whitespace; a "#" inside a word is a cosmetic rule, which fails _DOMAIN_RE
+        parts = _COMMENT_RE.split(line, 1)[0].split()
+        if len(parts) > 1 and parts[0] in _HOSTS_ADDRESSES:
+            parts = parts[1:]
+        elif len(parts) != 1:
+            return []
+        entries = [(host, False) for host in parts]
+    out = []
+    for domain, third_party in entries:
+        domain = domain.lower().rstrip(".")
+        if domain not in _IGNORED_HOSTS and _DOMAIN_RE.match(domain):
+            out.append((domain, third_party))
+    return out
+
+
+class DomainTrie:
+    """Set of domains, each also matching its subdomains: nested dicts keyed by label, top-level domain first."""
+
+    def __init__(self):
+        self.root: dict = {}
+        self.size = 0
+
+    def add(self, domain: str, third_party_only: bool = False):
+        node = self.root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(sys.intern(label), {})  # labels such as "com" are shared by most entries
+        if _END not in node:
+            self.size += 1
+            node[_END] = third_party_only
+        else:
+            node[_END] = node[_END] and third_party_only  # a rule for all requests wins
+
+    def match(self, host: str, third_party: bool = True) -> str | None:
+        """The listed domain that host is, or is a subdomain of, or None."""
+        node = self.root
+        labels = host.split(".")
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[i])
+            if node is None:
+                return None
+            only_third_party = node.get(_END)
+            if only_third_party is not None and (third_party or not only_third_party):
+                return ".".join(labels[i:])
+        return None
+
+
+def _sources() -> list[str]:
+    env = os.environ.get("CLAWFOX_BLOCKLISTS")
+    if env:
+        return [p for p in env.split(os.pathsep) if p]
+    try:
+        return sorted(e.path for e in os.scandir(BLOCKLIST_DIR) if e.is_file())
+    except OSError:
+        return []
+
+
+class Blocklist:
+    """The daemon's lists, loaded on first use, with counters of lookups and hits."""
+
+    def __init__(self):
+        self.trie = DomainTrie()
+        self.sources: list[str] = []
+        self.loaded = False
+        self.checked = 0  # requests looked up
+        self.blocked = 0  # requests that matched
+        self.hits: Counter = Counter()  # listed domain -> requests it blocked
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the list files (in a worker thread: big lists take a moment). Unreadable files are skipped; if no
+        domains were found, the next load looks again."""
+        with self._lock:
+            if self.loaded:
+                return
+            self.sources = []
+            for path in _sources():
+                try:
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        for line in f:
+                            for domain, third_party in parse_line(line):
+                                self.trie.add(domain, third_party)
+                except OSError:
+                    continue
+                self.sources.append(path)
+            self.loaded = bool(self.trie.size)
+
+    def check(self, host: str, third_party: bool) -> bool:
+        self.checked += 1
+        listed = self.trie.match(host, third_party)
+        if listed is None:
+            return False
+        self.blocked += 1
+        self.hits[listed] += 1
+        return True
+
+    def summary(self) -> str:
+        rate = f" ({100 * self.blocked / self.checked:.1f}%)" if self.checked else ""
+        out = (
+            f"ad/tracker lists: {self.trie.size} domains from {len(self.sources)} file(s); "
+            f"blocked {self.blocked} of {self.checked} requests checked{rate}"
+        )
+        if self.hits:
+            out += "; top: " + ", ".join(f"{domain} {n}" for domain, n in self.hits.most_common(5))
+        return out
+
+
+blocklist = Blocklist()
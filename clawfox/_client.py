@@ -1,89 +1,179 @@
-"""Client: ensure daemon is running, send one command, return output or raise."""
+"""Client: ensure daemon is running, send commands over a (possibly long-lived) connection, return output or raise."""
 from __future__ import annotations
 
 import fcntl
 import json
 import os
 import socket
-import subprocess
 import sys
 import time
 
-from ._paths import RUN_DIR, SOCKET_PATH, PIDFILE_PATH
+from ._paths import RUN_DIR, SOCKET_PATH
 
 STARTUP_LOCK_PATH = os.path.join(RUN_DIR, "startup.lock")
+MAX_RESPONSE_BYTES = 10_000_000
+# Requests a pipelining caller may have outstanding before it must read a response
+PIPELINE_DEPTH = 16
+# How long a cold start (daemon + Chromium launch) may take
+DAEMON_START_TIMEOUT_SECONDS = float(os.environ.get("CLAWFOX_START_TIMEOUT", "60"))
 
 
-def _daemon_running() -> bool:
-    if not os.path.exists(SOCKET_PATH) or not os.path.exists(PIDFILE_PATH):
-        return False
-    try:
-        with open(PIDFILE_PATH) as f:
-            pid = int(f.read().strip())
-    except (ValueError, OSError):
-        return False
-    try:
-        os.kill(pid, 0)
-    except OSError:
-        return False
+def _connect(timeout: float | None) -> socket.socket | None:
+    """Connect to the daemon socket; None if nothing is listening."""
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(timeout)
     try:
-        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        s.settimeout(2)
         s.connect(SOCKET_PATH)
+        return s
+    except (FileNotFoundError, ConnectionRefusedError):
         s.close()
-        return True
-    except (socket.error, OSError):
-        return False
+        return None
+    except OSError:
+        s.close()
+        raise
+
+
+def wait_for_ready(fd: int, timeout: float, what: str = "clawfox daemon"):
+    """Block until a starting daemon writes to its readiness pipe (read end fd). Raises RuntimeError if it exits
+    first or does not become ready within timeout seconds. Closes fd."""
+    import select
+
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(f"{what} did not start within {timeout:g}s")
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            if os.read(fd, 1):
+                return
+            raise RuntimeError(f"{what} exited during startup")
+    finally:
+        os.close(fd)
 
 
 def ensure_daemon():
-    """If daemon not running, start it and wait for socket. Uses a lock so only one process starts the daemon."""
-    if _daemon_running():
+    """If daemon not running, start it and wait until it reports ready. Uses a lock so only one process starts the daemon.
+
+    The daemon inherits the write end of a pipe (fd number in CLAWFOX_READY_FD) and writes one byte once its
+    browser is up and the socket is listening, so we return as soon as it is ready rather than polling.
+    """
+    s = _connect(2)
+    if s is not None:
+        s.close()
         return
     os.makedirs(RUN_DIR, mode=0o700, exist_ok=True)
     with open(STARTUP_LOCK_PATH, "a") as lock_file:
         lock_file.flush()
         fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
         try:
-            if _daemon_running():
+            # Another client may have started it while we waited for the lock
+            s = _connect(2)
+            if s is not None:
+                s.close()
                 return
-            subprocess.Popen(
-                [sys.executable, "-m", "clawfox", "daemon"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                start_new_session=True,
-            )
-            for _ in range(30):
-                time.sleep(0.2)
-                if _daemon_running():
-                    return
-            raise RuntimeError("clawfox daemon did not start in time")
+            import subprocess  # only needed on cold start; keeps the common path's imports small
+
+            read_fd, write_fd = os.pipe()
+            try:
+                subprocess.Popen(
+                    [sys.executable, "-m", "clawfox", "daemon"],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,
+                    pass_fds=(write_fd,),
+                    env=dict(os.environ, CLAWFOX_READY_FD=str(write_fd)),
+                )
+            except OSError:
+                os.close(read_fd)
+                raise
+            finally:
+                os.close(write_fd)
+            wait_for_ready(read_fd, DAEMON_START_TIMEOUT_SECONDS)
         finally:
             fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
 
-def send_command(cmd: str, **args) -> str:
-    """Send one command; return output string. Raises on error response."""
-    ensure_daemon()
-    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    s.settimeout(60)
-    try:
-        s.connect(SOCKET_PATH)
-        req = json.dumps({"cmd": cmd, "args": args}) + "\n"
-        s.sendall(req.encode("utf-8"))
-        buf = b""
-        while b"\n" not in buf and len(buf) < 10_000_000:
-            chunk = s.recv(65536)
+class Connection:
+    """One connection to the daemon that carries many requests.
+
+    Each request is one JSON line {"id", "cmd", "args", "session"?}; the daemon answers each with one JSON line carrying the
+    same id, in the order the requests were sent. send() and recv() can be used separately to pipeline requests.
+    """
+
+    def __init__(self, timeout: float = 60, session: str | None = None):
+        # Named browser session (own cookies, tabs and current page); None means the default session
+        self.session = session or os.environ.get("CLAWFOX_SESSION") or None
+        self._buf = b""
+        self._next_id = 1
+        # Hot path: just connect. Only if nothing is listening do we take the startup lock and launch the daemon.
+        try:
+            sock = _connect(timeout)
+            if sock is None:
+                ensure_daemon()
+                sock = _connect(timeout)
+        except OSError as e:
+            raise RuntimeError(f"could not connect to clawfox daemon: {e}")
+        if sock is None:
+            raise RuntimeError("could not connect to clawfox daemon")
+        self._sock = sock
+
+    def send(self, cmd: str, session: str | None = None, **args) -> int:
+        """Send one request without waiting for the reply; returns its id. session overrides the connection's."""
+        req_id = self._next_id
+        self._next_id += 1
+        req = {"id": req_id, "cmd": cmd, "args": args}
+        if session or self.session:
+            req["session"] = session or self.session
+        req = json.dumps(req) + "\n"
+        try:
+            self._sock.sendall(req.encode("utf-8"))
+        except OSError as e:
+            raise RuntimeError(f"lost connection to clawfox daemon: {e}")
+        return req_id
+
+    def recv(self) -> dict:
+        """Read the next response (raw dict with ok/output/error/id)."""
+        while b"\n" not in self._buf:
+            if len(self._buf) >= MAX_RESPONSE_BYTES:
+                raise RuntimeError("response from clawfox daemon too large")
+            try:
+                chunk = self._sock.recv(65536)
+            except OSError as e:
+                raise RuntimeError(f"lost connection to clawfox daemon: {e}")
             if not chunk:
-                break
-            buf += chunk
-        line = buf.decode("utf-8", errors="replace").split("\n", 1)[0]
-        out = json.loads(line)
-    finally:
+                raise RuntimeError("clawfox daemon closed the connection")
+            self._buf += chunk
+        line, self._buf = self._buf.split(b"\n", 1)
+        return json.loads(line.decode("utf-8", errors="replace"))
+
+    def call(self, cmd: str, session: str | None = None, **args) -> dict:
+        """Send one request and return its response dict."""
+        req_id = self.send(cmd, session, **args)
+        resp = self.recv()
+        if resp.get("id") not in (None, req_id):
+            raise RuntimeError(f"clawfox daemon answered request {resp.get('id')} while waiting for {req_id}")
+        return resp
+
+    def close(self):
         try:
-            s.close()
+            self._sock.close()
         except Exception:
             pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def send_command(cmd: str, **args) -> str:
+    """Send one command; return output string. Raises on error response."""
+    with Connection() as conn:
+        out = conn.call(cmd, **args)
     if not out.get("ok"):
         raise RuntimeError(out.get("error", "unknown error"))
     return out.get("output", "")
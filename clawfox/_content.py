@@ -1,80 +1,494 @@
 """Turn page HTML into markdown + interactive element list for agent use."""
 from __future__ import annotations
 
+import difflib
 import json
 import re
-from html import unescape
+from collections import Counter
 
-# Optional: use markdownify for HTML->markdown. Fallback to stripped text if not present.
+from . import _markdown
+
+# Optional: use markdownify for HTML->markdown. Fallback to the built-in streaming converter if not present.
 try:
     from markdownify import markdownify as md
     HAS_MARKDOWNIFY = True
 except ImportError:
     HAS_MARKDOWNIFY = False
 
-# Script we inject to get interactive elements with suggested Playwright selectors
-INTERACTIVE_ELEMENTS_JS = """
-() => {
-  const elements = [];
-  const nodes = document.querySelectorAll('a[href], button, input, [role="button"], [onclick]');
-  nodes.forEach((el, i) => {
+# ARIA roles of widgets the agent can act on (scripted divs and spans as well as native controls)
+ARIA_WIDGET_ROLES = (
+    "button", "link", "checkbox", "radio", "switch", "tab", "menuitem", "menuitemcheckbox", "menuitemradio",
+    "option", "combobox", "textbox", "searchbox", "slider", "spinbutton", "treeitem",
+)
+INTERACTIVE_SELECTOR = ", ".join(
+    ['a[href]', 'button', 'input:not([type="hidden"])', 'select', 'textarea', 'summary', '[onclick]',
+     '[contenteditable=""]', '[contenteditable="true"]']
+    + [f'[role="{role}"]' for role in ARIA_WIDGET_ROLES]
+)
+
+# JS function describing one interactive element, given its bounding box, with a suggested Playwright selector
+_DESCRIBE_ELEMENT_JS = """
+(el, rect) => {
     const tag = el.tagName.toLowerCase();
+    const role = el.getAttribute('role');
+    const label = (el.getAttribute('aria-label') || el.textContent || '').slice(0, 200).replace(/\\s+/g, ' ').trim();
     const id = el.id ? `#${el.id}` : null;
-    const name = el.name && (el.tagName === 'INPUT' || el.tagName === 'BUTTON') ? `[name="${el.name}"]` : null;
+    const name = el.name && ['input', 'button', 'select', 'textarea'].includes(tag) ? `[name="${el.name}"]` : null;
     let suggested = id || name || null;
-    if (!suggested && tag === 'button') {
-      const t = (el.textContent || '').trim().slice(0, 50);
-      if (t) suggested = `role=button[name="${t.replace(/"/g, '\\"')}"]`;
+    if (!suggested && (tag === 'button' || role)) {
+      const t = label.slice(0, 50);
+      if (t) suggested = `role=${role || 'button'}[name="${t.replace(/"/g, '\\\\"')}"]`;
     }
-    if (!suggested && tag === 'a' && el.textContent) {
-      const t = (el.textContent || '').trim().slice(0, 50);
+    if (!suggested && tag === 'a') {
+      const t = label.slice(0, 50);
       if (t) suggested = `text=${JSON.stringify(t)}`;
     }
-    if (!suggested) suggested = tag + (el.className ? '.' + String(el.className).split(/\\s+/)[0] : '');
+    if (!suggested) suggested = tag + (typeof el.className === 'string' && el.className ? '.' + el.className.trim().split(/\\s+/)[0] : '');
     const href = el.getAttribute('href');
-    const visible = el.offsetParent !== null && (el.offsetWidth > 0 || el.offsetHeight > 0);
-    elements.push({ tag, id: el.id || null, name: el.name || null, suggested, href: href || null, visible, text: (el.textContent || '').trim().slice(0, 80) });
-  });
-  return elements;
+    const visible = rect.width > 0 || rect.height > 0;
+    return { tag, id: el.id || null, name: el.name || null, suggested, href: href || null, visible, text: label.slice(0, 80) };
+  }
+"""
+
+# JS function returning the interactive elements under root (an element or the document), including those inside
+# open shadow roots (after the light-DOM matches of their scope). One querySelectorAll per scope finds the matches;
+# a TreeWalker over the same scope finds shadow hosts.
+_COLLECT_ELEMENTS_JS = """
+(root) => {
+    const SELECTOR = %s;
+    const nodes = root.nodeType === 1 && root.matches(SELECTOR) ? [root] : [];
+    const visit = (scope) => {
+      for (const el of scope.querySelectorAll(SELECTOR)) nodes.push(el);
+      const walker = document.createTreeWalker(scope, NodeFilter.SHOW_ELEMENT);
+      for (let el = walker.nextNode(); el; el = walker.nextNode()) {
+        if (el.shadowRoot) visit(el.shadowRoot);
+      }
+    };
+    visit(root);
+    return nodes;
+  }
+""" % json.dumps(INTERACTIVE_SELECTOR)
+
+# JS function turning collected elements into {total, elements}: the boxes of all of them are read in one pass (no
+# DOM writes in between, so layout is computed at most once), they are ordered viewport first (then the rest of
+# the rendered page, then elements with no box), each group in document order, and only elements
+# offset..offset+limit are described and returned. limit null returns them all. Each described element gets a ref:
+# a number, fixed for the element's lifetime in this document, that REF_SELECTOR_ENGINE_JS resolves back to it
+# (the map holds WeakRefs, so refs do not keep removed elements alive). New refs are numbered from at least
+# refStart, the daemon's next unused ref, so a new document never reuses an earlier one's numbers; nextRef is
+# returned for the daemon to advance its counter.
+_LIST_ELEMENTS_JS = """
+(nodes, offset, limit, refStart) => {
+    const describe = %s;
+    let refs = window.__clawfoxRefs;
+    if (!refs) {
+      refs = { next: 1, byRef: new Map(), byElement: new WeakMap() };
+      Object.defineProperty(window, '__clawfoxRefs', { value: refs });  // non-enumerable; a new document starts over
+    }
+    refs.next = Math.max(refs.next, refStart || 1);
+    const refOf = (el) => {
+      let ref = refs.byElement.get(el);
+      if (!ref) {
+        ref = refs.next++;
+        refs.byElement.set(el, ref);
+        refs.byRef.set(ref, new WeakRef(el));
+      }
+      return ref;
+    };
+    const rects = nodes.map((el) => el.getBoundingClientRect());
+    const width = window.innerWidth;
+    const height = window.innerHeight;
+    const groups = [[], [], []];
+    rects.forEach((r, i) => {
+      const rendered = r.width > 0 || r.height > 0;
+      const inView = rendered && r.bottom > 0 && r.right > 0 && r.top < height && r.left < width;
+      groups[inView ? 0 : rendered ? 1 : 2].push(i);
+    });
+    const order = groups[0].concat(groups[1], groups[2]);
+    const end = limit == null ? order.length : offset + limit;
+    return {
+      total: nodes.length,
+      elements: order.slice(offset, end).map((i) => ({ ref: refOf(nodes[i]), ...describe(nodes[i], rects[i]) })),
+      nextRef: refs.next,
+    };
+  }
+""" % _DESCRIBE_ELEMENT_JS.strip()
+
+# Playwright selector engine (registered as REF_SELECTOR_ENGINE) resolving an element ref with one map lookup instead
+# of a document query. A ref of an element that was removed, or from an earlier document, matches nothing.
+REF_SELECTOR_ENGINE = "clawfox-ref"
+REF_SELECTOR_ENGINE_JS = """
+{
+  query(root, ref) {
+    const refs = window.__clawfoxRefs;
+    const entry = refs && refs.byRef.get(Number(ref));
+    const el = entry && entry.deref();
+    return el && el.isConnected ? el : null;
+  },
+  queryAll(root, ref) {
+    const el = this.query(root, ref);
+    return el ? [el] : [];
+  },
+}
+"""
+# JS function: whether ref still names an element in the page
+REF_ALIVE_JS = """
+(ref) => {
+  const refs = window.__clawfoxRefs;
+  const entry = refs && refs.byRef.get(ref);
+  const el = entry && entry.deref();
+  return Boolean(el && el.isConnected);
 }
 """
 
+# JS function returning the element that holds the page's main content (reader mode). Paragraph-like blocks score
+# their parent, and half that to their grandparent, by length and commas. Candidates are then discounted by link
+# density (share of their text inside links) and by names and ancestors typical of navigation, footers and
+# banners. Falls back to the body when nothing scores.
+_FIND_MAIN_JS = """
+() => {
+    const body = document.body || document.documentElement;
+    const NEGATIVE = /nav|menu|footer|header|sidebar|comment|cookie|consent|banner|promo|advert|social|share|related|breadcrumb|popup|modal/i;
+    const POSITIVE = /article|content|main|post|entry|story|text|docs?\\b/i;
+    const scores = new Map();
+    const add = (el, n) => {
+      if (el && el.nodeType === 1 && el !== document.documentElement) scores.set(el, (scores.get(el) || 0) + n);
+    };
+    for (const block of body.querySelectorAll('p, pre, td, li, blockquote, dd')) {
+      const text = block.textContent.trim();
+      if (text.length < 25) continue;
+      const score = 1 + text.split(',').length + Math.min(Math.floor(text.length / 100), 3);
+      add(block.parentElement, score);
+      if (block.parentElement) add(block.parentElement.parentElement, score / 2);
+    }
+    let best = null;
+    let bestScore = 0;
+    for (const [el, raw] of scores) {
+      const length = el.textContent.length || 1;
+      let linked = 0;
+      for (const a of el.querySelectorAll('a')) linked += a.textContent.length;
+      let score = raw * (1 - Math.min(linked / length, 1));
+      const names = `${el.id || ''} ${typeof el.className === 'string' ? el.className : ''}`;
+      if (el.matches('article, main, [role="main"]')) score *= 1.5;
+      if (NEGATIVE.test(names) && !POSITIVE.test(names)) score *= 0.2;
+      if (el.closest('nav, header, footer, aside, [role="navigation"], [role="banner"], [role="contentinfo"]')) score *= 0.2;
+      if (score > bestScore) {
+        best = el;
+        bestScore = score;
+      }
+    }
+    return best || body;
+  }
+"""
+
+# Script we inject to get interactive elements with suggested Playwright selectors: {total, elements}, where
+# elements is the page offset..offset+limit of the list (see _LIST_ELEMENTS_JS)
+INTERACTIVE_ELEMENTS_JS = """
+({ offset = 0, limit = null, refStart = 1 } = {}) => {
+  const collect = %s;
+  const list = %s;
+  return list(collect(document), offset, limit, refStart);
+}
+""" % (_COLLECT_ELEMENTS_JS.strip(), _LIST_ELEMENTS_JS.strip())
+
+# --main with page.content()-style conversion: the main content element's HTML and the interactive elements in it
+MAIN_HTML_JS = """
+({ limit = null, refStart = 1 } = {}) => {
+  const main = (%s)();
+  const collect = %s;
+  const list = %s;
+  return { html: main.outerHTML, ...list(collect(main), 0, limit, refStart) };
+}
+""" % (_FIND_MAIN_JS.strip(), _COLLECT_ELEMENTS_JS.strip(), _LIST_ELEMENTS_JS.strip())
+
+# In-page converter: one walk of the live DOM yields the markdown, and the interactive elements under the same
+# root are listed as by INTERACTIVE_ELEMENTS_JS, so the HTML never has to be serialised and parsed again. With
+# mainOnly, it converts only the main content element (see _FIND_MAIN_JS).
+PAGE_MARKDOWN_JS = """
+({ mainOnly = false, limit = null, refStart = 1 } = {}) => {
+  const findMain = %s;
+  const collect = %s;
+  const listElements = %s;
+  const SKIP = new Set(['head', 'script', 'style', 'noscript', 'template', 'svg', 'math', 'iframe', 'object',
+    'canvas', 'video', 'audio', 'select', 'textarea']);
+  const BLOCK = new Set(['div', 'section', 'article', 'main', 'header', 'footer', 'nav', 'aside', 'form',
+    'figure', 'figcaption', 'fieldset', 'details', 'summary', 'dl', 'dt', 'dd', 'address', 'caption']);
+  const esc = (t) => t.replace(/[*_]/g, '\\\\$&');
+  const oneLine = (t) => t.replace(/\\s*\\n\\s*/g, ' ').trim();
+  const children = (node) => {
+    let out = '';
+    for (let c = node.firstChild; c; c = c.nextSibling) out += conv(c);
+    return out;
+  };
+  const list = (node, ordered) => {
+    let out = '\\n\\n';
+    let n = Number(node.getAttribute('start')) || 1;
+    for (let c = node.firstChild; c; c = c.nextSibling) {
+      if (c.nodeType !== 1 || c.localName !== 'li') {
+        const text = conv(c);
+        out += text.trim() ? text : '';
+        continue;
+      }
+      const marker = ordered ? `${n++}. ` : '- ';
+      const body = children(c).trim().replace(/\\n{2,}/g, '\\n');
+      out += marker + body.replace(/\\n/g, '\\n' + ' '.repeat(marker.length)) + '\\n';
+    }
+    return out + '\\n';
+  };
+  const table = (node) => {
+    const rows = [];
+    for (const row of node.rows) {
+      rows.push(Array.from(row.cells, (cell) => oneLine(children(cell)).replace(/[|]/g, '\\\\|')));
+    }
+    if (!rows.length) return '';
+    const width = Math.max(...rows.map((r) => r.length));
+    const line = (r) => '| ' + Array.from({ length: width }, (_, i) => r[i] || '').join(' | ') + ' |';
+    const sep = '| ' + Array(width).fill('---').join(' | ') + ' |';
+    return '\\n\\n' + [line(rows[0]), sep, ...rows.slice(1).map(line)].join('\\n') + '\\n\\n';
+  };
+  const conv = (node) => {
+    if (node.nodeType === 3) return esc(node.data.replace(/[ \\t\\r\\n\\f]+/g, ' '));
+    if (node.nodeType !== 1) return '';
+    const tag = node.localName;
+    if (SKIP.has(tag)) return '';
+    if (tag === 'pre' || tag === 'code') {
+      const text = node.textContent;
+      if (tag === 'pre') return '\\n\\n```\\n' + text.replace(/\\n$/, '') + '\\n```\\n\\n';
+      return text.trim() ? '`' + text + '`' : '';
+    }
+    switch (tag) {
+      case 'h1': case 'h2': case 'h3': case 'h4': case 'h5': case 'h6': {
+        const text = oneLine(children(node));
+        return text ? `\\n\\n${'#'.repeat(Number(tag[1]))} ${text}\\n\\n` : '';
+      }
+      case 'p': return '\\n\\n' + children(node).trim() + '\\n\\n';
+      case 'br': return '  \\n';
+      case 'hr': return '\\n\\n---\\n\\n';
+      case 'strong': case 'b': {
+        const text = children(node);
+        return text.trim() ? `**${text.trim()}**` : text;
+      }
+      case 'em': case 'i': {
+        const text = children(node);
+        return text.trim() ? `*${text.trim()}*` : text;
+      }
+      case 'a': {
+        const text = children(node).trim();
+        const href = node.getAttribute('href');
+        return href && !href.startsWith('javascript:') && text ? `[${text}](${href})` : text;
+      }
+      case 'img': {
+        const src = node.getAttribute('src');
+        return src ? `![${node.getAttribute('alt') || ''}](${src})` : '';
+      }
+      case 'ul': return list(node, false);
+      case 'ol': return list(node, true);
+      case 'table': return table(node);
+      case 'blockquote': {
+        const text = children(node).trim().replace(/\\n{3,}/g, '\\n\\n');
+        return '\\n\\n' + text.split('\\n').map((l) => (l ? '> ' + l : '>')).join('\\n') + '\\n\\n';
+      }
+      default:
+        return BLOCK.has(tag) ? '\\n\\n' + children(node) + '\\n\\n' : children(node);
+    }
+  };
+  const root = mainOnly ? findMain() : document.body || document.documentElement;
+  const markdown = root ? conv(root).replace(/[ \\t]+\\n\\n/g, '\\n\\n').replace(/\\n[ \\t]+\\n/g, '\\n\\n')
+    .replace(/\\n{3,}/g, '\\n\\n').trim() : '';
+  return { markdown, ...(root ? listElements(collect(root), 0, limit, refStart) : { total: 0, elements: [] }) };
+}
+""" % (_FIND_MAIN_JS.strip(), _COLLECT_ELEMENTS_JS.strip(), _LIST_ELEMENTS_JS.strip())
+
+
+def html_to_markdown(html: str, builtin: bool = False, max_chars: int | None = None) -> str:
+    """Markdown for html: markdownify when installed (unless builtin), else the streaming converter in _markdown.
+    With max_chars, at most that much: the streaming converter stops there instead of converting the rest."""
+    if HAS_MARKDOWNIFY and not builtin:
+        return md(html, heading_style="ATX", strip=["script", "style"])[:max_chars]
+    return _markdown.convert(html, max_chars)[0]
+
 
-def html_to_markdown(html: str) -> str:
-    if HAS_MARKDOWNIFY:
-        return md(html, heading_style="ATX", strip=["script", "style"])
-    # Fallback: strip tags and collapse whitespace
-    text = re.sub(r"<script[^>]*>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = unescape(text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text[:50000]  # cap size
+def _format_element(e: dict, marker: str = "-") -> str:
+    sel = e.get("suggested") or "?"
+    extra = []
+    if e.get("href"):
+        extra.append(f"href={e['href']}")
+    if e.get("text"):
+        extra.append(f"text={e['text'][:40]!r}")
+    line = f"{marker} @{e['ref']} `{sel}`" if e.get("ref") else f"{marker} `{sel}`"
+    if extra:
+        line += " " + " ".join(extra)
+    return line
 
 
-def format_interactive_elements(elements: list[dict]) -> str:
+def format_interactive_elements(elements: list[dict], total: int | None = None, offset: int = 0) -> str:
+    """The element list section. With total (the number on the page), says how to get the rest when this list,
+    starting at offset, does not reach the end."""
     if not elements:
         return ""
-    lines = ["## Interactive elements (suggested selectors)", ""]
-    for e in elements:
-        sel = e.get("suggested") or "?"
-        extra = []
-        if e.get("href"):
-            extra.append(f"href={e['href']}")
-        if e.get("text"):
-            extra.append(f"text={e['text'][:40]!r}")
-        line = f"- `{sel}`"
-        if extra:
-            line += " " + " ".join(extra)
-        lines.append(line)
+    lines = ["## Interactive elements (@ref or suggested selector)", ""]
+    lines.extend(_format_element(e) for e in elements)
+    end = offset + len(elements)
+    if total is not None and (offset or end < total):
+        more = f"; more with: clawfox elements --offset {end}" if end < total else ""
+        lines.extend(["", f"[elements {offset + 1}-{end} of {total}, viewport first{more}]"])
     return "\n".join(lines) + "\n"
 
 
 def build_go_output(html: str, interactive_elements: list[dict], as_html: bool) -> str:
     if as_html:
         return html
-    md_body = html_to_markdown(html)
-    elements_section = format_interactive_elements(interactive_elements)
+    return build_markdown_output(html_to_markdown(html), interactive_elements)
+
+
+def build_markdown_output(md_body: str, interactive_elements: list[dict], total: int | None = None) -> str:
+    """Join already-converted markdown (e.g. from PAGE_MARKDOWN_JS) with the interactive element list."""
+    elements_section = format_interactive_elements(interactive_elements, total)
     if elements_section:
         return md_body.rstrip() + "\n\n" + elements_section
     return md_body
+
+
+# Accessibility-tree roles that only group or lay out content: not printed, their children take their place
+_AX_TRANSPARENT_ROLES = {"generic", "none", "presentation", "RootWebArea", "WebArea", "LineBreak"}
+# Roles whose subtree adds nothing (the text of a StaticText is split into these)
+_AX_SKIPPED_ROLES = {"InlineTextBox", "ListMarker"}
+_AX_STATES = ("level", "checked", "pressed", "selected", "expanded", "disabled", "required", "readonly", "invalid")
+_AX_WIDGET_ROLES = set(ARIA_WIDGET_ROLES) | {"listbox", "menubutton", "gridcell"}
+# Chromium roles that are not ARIA roles, as the ARIA role Playwright's role= selector matches them by
+_AX_SELECTOR_ROLES = {"menubutton": "button"}
+_AX_SPACE_RE = re.compile(r"\s+")
+
+
+def _ax_value(field: dict | None) -> str:
+    value = (field or {}).get("value")
+    return "" if value is None else _AX_SPACE_RE.sub(" ", str(value)).strip()
+
+
+def _ax_states(node: dict) -> tuple[str, str | None]:
+    """(" [level=2] [checked]"-style suffix, link URL) from an AX node's properties."""
+    states, url = [], None
+    props = {p.get("name"): (p.get("value") or {}).get("value") for p in node.get("properties") or ()}
+    for name in _AX_STATES:
+        value = props.get(name)
+        if value is True or value == "true":
+            states.append(f"[{name}]")
+        elif value not in (None, False, "false", "", 0) or (name == "expanded" and value is False):
+            states.append(f"[{name}={str(value).lower() if isinstance(value, bool) else value}]")
+    if props.get("url"):
+        url = str(props["url"])
+        states.append(f"[url={url}]")
+    value = _ax_value(node.get("value"))
+    if value:
+        states.append(f"[value={json.dumps(value[:80], ensure_ascii=False)}]")
+    return "".join(" " + s for s in states), url
+
+
+def build_ax_output(nodes: list[dict]) -> tuple[str, list[dict]]:
+    """Outline of a CDP Accessibility.getFullAXTree result and the widgets in it.
+
+    One line per meaningful node, indented by depth: `- role "name" [state]`, or `- text: ...` for text not
+    already given as its parent's name. Ignored and purely structural nodes are dropped and their children
+    hoisted. Widgets with a name become exact role selectors, with `>> nth=K` where role and name repeat.
+    """
+    by_id = {n["nodeId"]: n for n in nodes}
+    roots = [n["nodeId"] for n in nodes if not n.get("parentId")]
+    lines, widgets = [], []
+    stack = [(node_id, 0, "") for node_id in reversed(roots)]  # iterative: real trees are deeper than recursion allows
+    while stack:
+        node_id, depth, parent_name = stack.pop()
+        node = by_id.get(node_id)
+        role = _ax_value(node.get("role")) if node else ""
+        if node is None or role in _AX_SKIPPED_ROLES:
+            continue
+        name = _ax_value(node.get("name"))
+        if role == "StaticText":
+            if name and name != parent_name:
+                lines.append(f"{'  ' * depth}- text: {name}")
+            continue
+        if not node.get("ignored") and role not in _AX_TRANSPARENT_ROLES:
+            states, url = _ax_states(node)
+            label = f" {json.dumps(name, ensure_ascii=False)}" if name else ""
+            lines.append(f"{'  ' * depth}- {role}{label}{states}")
+            if name and role in _AX_WIDGET_ROLES:
+                widgets.append((_AX_SELECTOR_ROLES.get(role, role), name, url))
+            depth, parent_name = depth + 1, name
+        for child in reversed(node.get("childIds") or ()):
+            stack.append((child, depth, parent_name))
+    counts = Counter((role, name) for role, name, _ in widgets)
+    seen = Counter()
+    elements = []
+    for role, name, url in widgets:
+        selector = f"role={role}[name={json.dumps(name, ensure_ascii=False)}s]"
+        if counts[role, name] > 1:
+            selector += f" >> nth={seen[role, name]}"
+            seen[role, name] += 1
+        elements.append({"suggested": selector, "href": url, "text": name[:80]})
+    return "\n".join(lines), elements
+
+
+# Lines of a list or table; each is its own block so one changed item doesn't repeat the whole list
+_ITEM_LINE_RE = re.compile(r"^\s*(?:[-*+]\s|\d+[.)]\s|\|)")
+
+
+def markdown_blocks(markdown: str) -> list[str]:
+    """Split markdown into diffable blocks: paragraphs, headings, code blocks, and single list items/table rows."""
+    blocks = []
+    for para in re.split(r"\n[ \t]*\n", markdown):
+        para = para.strip("\n")
+        if not para.strip():
+            continue
+        lines = para.split("\n")
+        if len(lines) > 1 and all(_ITEM_LINE_RE.match(line) for line in lines):
+            blocks.extend(lines)
+        else:
+            blocks.append(para)
+    return blocks
+
+
+def _element_key(e: dict) -> tuple:
+    return (e.get("suggested"), e.get("href"), e.get("text"))
+
+
+def _multiset_minus(items: list[dict], other: list[dict]) -> list[dict]:
+    """Elements of items not matched by one in other (counting duplicates), in items' order."""
+    remaining = Counter(_element_key(e) for e in other)
+    out = []
+    for e in items:
+        k = _element_key(e)
+        if remaining[k]:
+            remaining[k] -= 1
+        else:
+            out.append(e)
+    return out
+
+
+def build_diff_output(old_md: str, old_elements: list[dict], new_md: str, new_elements: list[dict]) -> str:
+    """What changed between two snapshots of a page: markdown blocks removed (-) and added (+), each hunk headed by
+    its block position in the new page, then interactive elements removed and added."""
+    old_blocks, new_blocks = markdown_blocks(old_md), markdown_blocks(new_md)
+    matcher = difflib.SequenceMatcher(None, old_blocks, new_blocks, autojunk=False)
+    hunks, added, removed = [], 0, 0
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        hunk = [f"@@ block {j1 + 1} @@"]
+        for block in old_blocks[i1:i2]:
+            hunk.append("- " + block.replace("\n", "\n  "))
+        for block in new_blocks[j1:j2]:
+            hunk.append("+ " + block.replace("\n", "\n  "))
+        hunks.append("\n".join(hunk))
+        removed += i2 - i1
+        added += j2 - j1
+    gone = _multiset_minus(old_elements, new_elements)
+    new = _multiset_minus(new_elements, old_elements)
+    if not hunks and not gone and not new:
+        return "No changes since the last snapshot.\n"
+    parts = [f"## Changes since the last snapshot ({added} blocks added, {removed} removed)"]
+    parts.extend(hunks)
+    if gone or new:
+        lines = [f"## Interactive elements changed ({len(new)} added, {len(gone)} removed)", ""]
+        lines.extend(_format_element(e, "-") for e in gone)
+        lines.extend(_format_element(e, "+") for e in new)
+        parts.append("\n".join(lines))
+    return "\n\n".join(parts) + "\n"
@@ -1,27 +1,112 @@
-"""Daemon: one Playwright browser, Unix socket server, one command at a time."""
+"""Daemon: Playwright browser(s), Unix socket server on an asyncio event loop.
+
+Clients may keep a connection open and send many newline-terminated JSON requests on it; each gets one JSON
+response line (echoing the request's "id") in order. Requests on one connection run in order; different
+connections run concurrently, except that commands driving the same page are serialised by a per-page lock.
+
+Each request may name a session. The default session uses the persistent browser profile; every named session
+gets its own BrowserContext (cookies, tabs, current page) in one shared Chromium, launched on first use.
+
+After CLAWFOX_IDLE_MINUTES without commands the daemon suspends: it remembers each session's tab URLs, closes every
+context and browser and stops the Playwright driver, keeping only the socket. The next command relaunches
+lazily and reopens the tabs.
+
+A memory watchdog checks, at most every MEMORY_CHECK_SECONDS and only between commands, the JS heap of the page
+about to be driven and the RSS of the browser process tree. Past CLAWFOX_MAX_PAGE_HEAP_MB the page is replaced by
+a fresh one at the same URL and tab position; past CLAWFOX_MAX_BROWSER_RSS_MB the session's whole context is
+rebuilt with its cookies, storage and tabs. Each recycle is reported in the response's "recycled" list.
+"""
 from __future__ import annotations
 
+import asyncio
+import base64
 import json
 import os
+import re
 import signal
 import socket
 import sys
 import time
-from datetime import datetime
-from pathlib import Path
+from collections import Counter
+from urllib.parse import urlsplit
 
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
 
-from ._content import INTERACTIVE_ELEMENTS_JS, build_go_output
+from ._blocklist import blocklist
+from ._content import (
+    INTERACTIVE_ELEMENTS_JS,
+    MAIN_HTML_JS,
+    PAGE_MARKDOWN_JS,
+    REF_ALIVE_JS,
+    REF_SELECTOR_ENGINE,
+    REF_SELECTOR_ENGINE_JS,
+    build_ax_output,
+    build_diff_output,
+    build_markdown_output,
+    format_interactive_elements,
+    html_to_markdown,
+)
+from ._launch import browser_rss_by_profile, launch_options, process_tree_rss
 from ._paths import (
+    BLOCKABLE_RESOURCES,
     BROWSER_PROFILE_DIR,
+    CONVERTERS,
+    DEFAULT_CONVERTER,
     DEFAULT_GO_TIMEOUT_MS,
+    DEFAULT_IDLE_MINUTES,
+    DEFAULT_MAX_ELEMENTS,
+    DEFAULT_MAX_BROWSER_RSS_MB,
+    DEFAULT_MAX_PAGE_HEAP_MB,
+    DEFAULT_SCREENSHOT_FORMAT,
+    DEFAULT_SCREENSHOT_POLICY,
     PIDFILE_PATH,
-    RUN_DIR,
-    SCREENSHOT_DIR,
-    SCREENSHOT_MAX_AGE_SECONDS,
+    SCREENSHOT_FORMATS,
+    SCREENSHOT_POLICIES,
+    SESSIONS_DIR,
     SOCKET_PATH,
 )
+from ._screenshots import compare as compare_screenshots, store as screenshots
+from ._server import (
+    DEFAULT_SESSION,
+    MAX_REQUEST_BYTES,
+    bind_socket,
+    delete_pid,
+    parse_request,
+    response_line,
+    signal_ready,
+    take_ready_fd,
+    write_pid,
+)
+
+# Commands that act on the session or daemon rather than on the current page; they take no page lock
+CONTEXT_COMMANDS = ("tabs", "focus_tab", "sessions", "close_session", "stop", "block")
+SESSION_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+MEMORY_CHECK_SECONDS = 30
+# Minimum time between two context recycles of one session for browser RSS
+RSS_RECYCLE_COOLDOWN_SECONDS = 300
+ELEMENT_REF_RE = re.compile(r"^@(\d+)$")
+# Typical transfer size per request of each blockable type (rough web-wide medians), to estimate bytes saved
+BLOCKED_BYTES_ESTIMATE = {"image": 20_000, "font": 30_000, "media": 300_000, "stylesheet": 15_000, "ads": 15_000}
+CHARS_PER_TOKEN = 4  # rough estimate behind --max-tokens
+DEFAULT_PAGE_CHARS = 20_000  # page size for show --page when the output was not split
+PAGE_HEAP_JS = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+# Installs (once per document) a MutationObserver that counts DOM changes, and returns what identifies the DOM's
+# current state: the document (performance.timeOrigin differs for every load, so navigations and reloads change
+# it), the URL (covers pushState), the mutation generation and the scroll position (which orders elements).
+# Property-only changes (checked, value) make no mutation; commands that cause them call _Tab.invalidate_snapshot.
+DOM_GENERATION_JS = """
+() => {
+  let state = window.__clawfoxDom;
+  if (!state) {
+    state = { generation: 0 };
+    state.observer = new MutationObserver(() => { state.generation++; });
+    state.observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    Object.defineProperty(window, '__clawfoxDom', { value: state });
+  }
+  if (state.observer.takeRecords().length) state.generation++;
+  return [performance.timeOrigin, location.href, state.generation, Math.round(scrollX), Math.round(scrollY)];
+}
+"""
 
 def _chrome_version_headers(browser):
     """Build UA and sec-ch-ua from the actual Chromium version (not hardcoded)."""
@@ -41,66 +126,844 @@ def _chrome_version_headers(browser):
     return user_agent, extra_headers, major
 
 
-def _write_pid():
-    os.makedirs(RUN_DIR, mode=0o700, exist_ok=True)
-    with open(PIDFILE_PATH, "w") as f:
-        f.write(str(os.getpid()))
+async def _add_user_agent_data_script(context, chrome_major: str):
+    """Make navigator.userAgentData look like desktop Chrome (reduces "headless" detection)."""
+    try:
+        await context.add_init_script(
+            f"""
+            try {{
+                Object.defineProperty(navigator, 'userAgentData', {{
+                    get: () => ({{
+                        brands: [
+                            {{ brand: 'Chromium', version: '{chrome_major}' }},
+                            {{ brand: 'Google Chrome', version: '{chrome_major}' }},
+                            {{ brand: 'Not_A Brand', version: '24' }}
+                        ],
+                        mobile: false,
+                        platform: 'Linux'
+                    }}),
+                    configurable: true
+                }});
+            }} catch (e) {{}}
+            """
+        )
+    except Exception:
+        pass
+
+
+class _Tab:
+    """What the daemon keeps about one open tab. Held by its _Session and dropped when the page closes."""
+
+    def __init__(self, session: "_Session", page):
+        self.session = session
+        self.page = page
+        self.lock = asyncio.Lock()  # serialises commands on the page (other pages proceed concurrently)
+        self.cdp = None  # CDP session for captures and the accessibility tree, opened on first use
+        self.snapshot = None  # (DOM state key, mode, markdown or HTML, elements, total elements) of its last output
+        self.output = None  # (text of its last output, page size in chars, page offsets), for show --page
+        self.last_screenshot = None  # (capture options, comparison state) of its latest screenshot
+
+    def invalidate_snapshot(self):
+        """Make the next output re-read the page, after a command that may have changed what the DOM generation
+        cannot see (form values, checked state, anything eval does). The old snapshot stays the base for --diff."""
+        if self.snapshot is not None and self.snapshot[0] is not None:
+            self.snapshot = (self.snapshot[0][:2] + (None,),) + self.snapshot[1:]
+
+
+class _Session:
+    """One isolated browsing session: a BrowserContext, its tabs, and the tab commands drive."""
+
+    def __init__(self, host: "_BrowserHost", name: str, context, page):
+        self.host = host
+        self.name = name
+        self.context = context
+        self.current_page_ref = [page]  # mutable so focus_tab can switch which tab we drive
+        # Tab order as the user sees it; context.pages is creation order, which recycling would change
+        self.tabs = list(context.pages) or [page]
+        self.last_memory_check = time.monotonic()
+        self.last_rss_recycle = float("-inf")
+        self.rss_futile = None  # browser RSS a context recycle could not bring under the limit
+        self.block = _block_types(os.environ.get("CLAWFOX_BLOCK") or "")  # resource types blocked (block command)
+        self.block_overrides: dict = {}  # page -> a command's --block, in place of block for that page while it runs
+        self.blocked = Counter()  # resource type (or "ads" for the domain lists) -> requests blocked
+        self._routed = None  # the context the blocking route is installed on
+        self._route_lock = asyncio.Lock()  # commands on different tabs update the route concurrently
+        self._tab_state: dict = {}  # page -> _Tab, while the page is open
+
+    def tab(self, page) -> _Tab:
+        """page's _Tab, created on first use. A closed page gets a fresh one that is not kept."""
+        tab = self._tab_state.get(page)
+        if tab is None:
+            tab = _Tab(self, page)
+            if not page.is_closed():
+                self._tab_state[page] = tab
+                page.once("close", lambda _: self._tab_state.pop(page, None))
+        return tab
+
+    def blocking(self, page=None) -> frozenset:
+        """Types blocked for page's requests: the --block of a command running on it, else the session's list."""
+        return self.block_overrides.get(page, self.block)
+
+    async def update_route(self):
+        """Route the context's requests through _route while anything is blocked, and only then: routing disables
+        the HTTP cache."""
+        async with self._route_lock:
+            anywhere = self.block.union(*self.block_overrides.values())
+            if "ads" in anywhere and not blocklist.loaded:
+                await asyncio.to_thread(blocklist.load)
+            wanted = self.context if anywhere else None
+            if self._routed is not None and self._routed is not wanted:
+                try:
+                    await self._routed.unroute("**/*", self._route)
+                except Exception:
+                    pass  # e.g. the context was recycled
+                self._routed = None
+            if wanted is not None and self._routed is None:
+                await wanted.route("**/*", self._route)
+                self._routed = wanted
+
+    async def _route(self, route):
+        request = route.request
+        kind = request.resource_type
+        try:
+            try:
+                page = request.frame.page
+            except Exception:
+                page = None  # e.g. a service worker's request has no frame
+            blocking = self.blocking(page)
+            if kind in blocking:
+                self.blocked[kind] += 1
+                await route.abort("blockedbyclient")
+            elif "ads" in blocking and _listed(request):
+                self.blocked["ads"] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception:
+            pass  # the page or context closed while the request was in flight
+
+    def ordered_pages(self) -> list:
+        """Open tabs in order, including pages the site opened itself (popups) at the end."""
+        self.tabs = [p for p in self.tabs if not p.is_closed()]
+        self.tabs += [p for p in self.context.pages if p not in self.tabs]
+        return list(self.tabs)
+
+
+class _BrowserHost:
+    """Owns the Playwright driver, the persistent default context and the shared browser for named sessions."""
+
+    def __init__(self, headful: bool, default_session: bool = True):
+        self.playwright = None  # started on first use, stopped while suspended
+        self.headful = headful
+        # False in pool workers other than the first: only one process may own the persistent profile
+        self.default_session = default_session
+        self.launch_options = launch_options(headful=headful)
+        # Build UA/headers from default version (persistent context has no browser until after launch)
+        _fake_browser = type("_FakeBrowser", (), {"version": "131.0.0.0"})()
+        self.user_agent, self.extra_headers, self.chrome_major = _chrome_version_headers(_fake_browser)
+        self.browser = None  # shared Chromium for named sessions, launched on first use
+        self.sessions: dict[str, _Session] = {}
+        # Tabs and cookies of sessions closed by suspend(), restored when the session is next used
+        self.suspended_tabs: dict[str, dict] = {}
+        self.active_requests = 0
+        self.last_activity = time.monotonic()
+        # Next unused element ref, daemon-wide: no tab or document reuses a number handed out before
+        self.next_ref = 1
+        self.pending_screenshots: set = set()  # background screenshot tasks, finished before the daemon exits
+        self._lock = asyncio.Lock()
+
+    async def session(self, name: str | None) -> _Session:
+        """Return the named session, creating its context on first use."""
+        name = name or DEFAULT_SESSION
+        session = self.sessions.get(name)
+        if session is not None:
+            return session
+        if not SESSION_NAME_RE.match(name):
+            raise ValueError(f"invalid session name {name!r} (use letters, digits, '.', '_' or '-')")
+        if name == DEFAULT_SESSION and not self.default_session:
+            raise ValueError("this daemon does not serve the default session")
+        async with self._lock:
+            session = self.sessions.get(name)
+            if session is None:
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+                    await self.playwright.selectors.register(REF_SELECTOR_ENGINE, REF_SELECTOR_ENGINE_JS)
+                session = await self._open_session(name)
+                saved = self.suspended_tabs.pop(name, None)
+                if saved:
+                    session.block = saved["block"]
+                await session.update_route()
+                if saved:
+                    await _restore_tabs(session, saved)
+                self.sessions[name] = session
+        return session
+
+    async def _open_session(self, name: str) -> _Session:
+        if name == DEFAULT_SESSION:
+            context = await self.playwright.chromium.launch_persistent_context(
+                BROWSER_PROFILE_DIR,
+                user_agent=self.user_agent,
+                extra_http_headers=self.extra_headers,
+                **self.launch_options,
+            )
+        else:
+            if self.browser is None:
+                self.browser = await self.playwright.chromium.launch(**self.launch_options)
+            state_path = _session_state_path(name)
+            context = await self.browser.new_context(
+                user_agent=self.user_agent,
+                extra_http_headers=self.extra_headers,
+                storage_state=state_path if os.path.exists(state_path) else None,
+            )
+        await _add_user_agent_data_script(context, self.chrome_major)
+        # Use first existing page or create one (persistent context can have existing pages from last run)
+        page = context.pages[0] if context.pages else await context.new_page()
+        return _Session(self, name, context, page)
+
+    def describe_sessions(self) -> list[dict]:
+        out = [
+            {"name": s.name, "tabs": len(s.ordered_pages()), "url": s.current_page_ref[0].url}
+            for s in self.sessions.values()
+        ]
+        for name, saved in self.suspended_tabs.items():
+            url = saved["urls"][saved["current"]] if saved["urls"] else ""
+            out.append({"name": name, "tabs": len(saved["urls"]), "url": url, "suspended": True})
+        return out
+
+    async def _close_context(self, session: _Session):
+        """Close a session's context. Named sessions save their cookies/storage so they survive restarts."""
+        if session.name != DEFAULT_SESSION:
+            try:
+                os.makedirs(SESSIONS_DIR, mode=0o700, exist_ok=True)
+                await session.context.storage_state(path=_session_state_path(session.name))
+            except Exception:
+                pass
+        try:
+            await session.context.close()
+        except Exception:
+            pass
+
+    async def close_session(self, name: str):
+        self.suspended_tabs.pop(name, None)
+        session = self.sessions.pop(name, None)
+        if session is not None:
+            await self._close_context(session)
 
+    async def _stop_browser(self):
+        if self.browser is not None:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+        if self.playwright is not None:
+            try:
+                await self.playwright.stop()
+            except Exception:
+                pass
+            self.playwright = None
 
-def _delete_pid():
+    async def suspend_if_idle(self, idle_seconds: float) -> bool:
+        """If no command has run for idle_seconds, close every context and browser and stop the driver,
+        remembering each session's tabs. Returns True if it suspended."""
+        async with self._lock:
+            if self.playwright is None or self.active_requests:
+                return False
+            if time.monotonic() - self.last_activity < idle_seconds:
+                return False
+            # Detach all sessions before the first await so new requests wait on the lock and relaunch
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+            for session in sessions:
+                self.suspended_tabs[session.name] = await _tab_snapshot(session)
+                await self._close_context(session)
+            await self._stop_browser()
+        return True
+
+    async def recycle_context(self, session: _Session):
+        """Replace a session's context with a fresh one, keeping its cookie jar (session cookies included), storage,
+        tab URLs, order and current tab. Storage comes back through the named session's saved state or the
+        persistent profile; the cookies through _tab_snapshot. Commands in flight on the session's other tabs fail
+        and can be retried."""
+        async with self._lock:
+            saved = await _tab_snapshot(session)
+            await self._close_context(session)
+            # Only the context and first page of fresh are kept; the route goes on the session itself
+            fresh = await self._open_session(session.name)
+            session.context = fresh.context
+            session.tabs = fresh.tabs
+            session.current_page_ref[0] = fresh.current_page_ref[0]
+            await session.update_route()
+            await _restore_tabs(session, saved)
+
+    async def close(self):
+        for name in list(self.sessions):
+            await self.close_session(name)
+        await self._stop_browser()
+
+
+async def _tab_snapshot(session: _Session) -> dict:
+    """What _restore_tabs needs to rebuild a session in a new context: tab URLs, current tab, block list and the
+    cookie jar. The persistent profile only keeps cookies with an expiry, so session cookies are carried here."""
+    pages = session.ordered_pages()
+    current = session.current_page_ref[0]
     try:
-        os.unlink(PIDFILE_PATH)
-    except OSError:
-        pass
+        cookies = await session.context.cookies()
+    except Exception:
+        cookies = []
+    return {
+        "urls": [p.url for p in pages],
+        "current": pages.index(current) if current in pages else 0,
+        "block": session.block,
+        "cookies": cookies,
+    }
 
 
-def _screenshot_cleanup():
-    """Remove screenshot files older than SCREENSHOT_MAX_AGE_SECONDS."""
+def _block_types(spec: str) -> frozenset:
+    """Resource types for a --block list such as "images,fonts" (empty or "none" for none)."""
+    names = [n.strip().lower() for n in spec.split(",") if n.strip()]
+    if names in ([], ["none"]):
+        return frozenset()
+    for n in names:
+        if n not in BLOCKABLE_RESOURCES:
+            raise ValueError(f"cannot block {n!r} (use {', '.join(BLOCKABLE_RESOURCES)} or none)")
+    return frozenset(BLOCKABLE_RESOURCES[n] for n in names)
+
+
+async def _load_blocklist():
+    """Load the ad/tracker lists if needed, for a command enabling "ads"; ValueError if there are none."""
+    if not blocklist.loaded:
+        await asyncio.to_thread(blocklist.load)
+    if not blocklist.trie.size:
+        raise ValueError(
+            "no ad/tracker lists loaded: put EasyList or hosts files in ~/.clawfox/blocklists/ "
+            "(or list files in CLAWFOX_BLOCKLISTS)"
+        )
+
+
+def _listed(request) -> bool:
+    """Whether the ad/tracker lists block a request. Navigations of the top frame are never blocked. A request is
+    third-party when its host is not the frame's site, taken as the frame host's last two labels (there is no
+    public suffix list, so e.g. all of co.uk counts as one site)."""
+    host = urlsplit(request.url).hostname
+    if not host:
+        return False
     try:
-        p = Path(SCREENSHOT_DIR)
-        if not p.exists():
-            return
-        cutoff = time.time() - SCREENSHOT_MAX_AGE_SECONDS
-        for f in p.iterdir():
-            if f.is_file() and f.stat().st_mtime < cutoff:
-                try:
-                    f.unlink()
-                except OSError:
-                    pass
-    except OSError:
-        pass
+        frame = request.frame
+        if request.is_navigation_request() and frame.parent_frame is None:
+            return False
+        site = ".".join((urlsplit(frame.url).hostname or "").split(".")[-2:])
+    except Exception:
+        site = ""  # e.g. a service worker's request has no frame
+    third_party = not site or not (host == site or host.endswith("." + site))
+    return blocklist.check(host, third_party)
+
+
+def _blocked_summary(blocked: Counter) -> str:
+    """E.g. "34 requests (image 30, font 4), ~0.7 MB saved (estimated)"."""
+    saved = sum(BLOCKED_BYTES_ESTIMATE.get(kind, 0) * n for kind, n in blocked.items())
+    kinds = ", ".join(f"{kind} {n}" for kind, n in blocked.most_common())
+    size = f"{saved / 1e6:.1f} MB" if saved >= 1e6 else f"{saved // 1000} KB"
+    return f"{sum(blocked.values())} requests ({kinds}), ~{size} saved (estimated)"
+
+
+async def _restore_tabs(session: _Session, saved: dict):
+    """Put back a suspended session's cookies, reopen its tabs (in order) and re-select its current tab."""
+    if saved.get("cookies"):
+        try:
+            await session.context.add_cookies(saved["cookies"])
+        except Exception:
+            pass
+    urls = saved["urls"] or ["about:blank"]
+    pages = [session.current_page_ref[0]]
+    for _ in urls[1:]:
+        pages.append(await session.context.new_page())
+
+    async def load(page, url):
+        if url and url != "about:blank":
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=DEFAULT_GO_TIMEOUT_MS)
+            except Exception:
+                pass
+
+    await asyncio.gather(*(load(p, u) for p, u in zip(pages, urls)))
+    session.tabs = pages
+    session.current_page_ref[0] = pages[min(saved["current"], len(pages) - 1)]
+
+
+async def _recycle_page(session: _Session, page):
+    """Swap page for a fresh page at the same URL and tab position (same context, so cookies are kept)."""
+    fresh = await session.context.new_page()
+    if page.url and page.url != "about:blank":
+        try:
+            await fresh.goto(page.url, wait_until="domcontentloaded", timeout=DEFAULT_GO_TIMEOUT_MS)
+        except Exception:
+            pass
+    tabs = [p for p in session.ordered_pages() if p is not fresh]
+    if page in tabs:
+        tabs[tabs.index(page)] = fresh
+    else:
+        tabs.append(fresh)
+    session.tabs = tabs
+    if session.current_page_ref[0] is page:
+        session.current_page_ref[0] = fresh
+    await page.close()
+
+
+def _limit_bytes(env: str, default_mb: int) -> int:
+    return int(float(os.environ.get(env) or default_mb) * 1024 * 1024)
+
+
+async def _browser_rss(session: _Session) -> int | None:
+    """RSS of the browser holding a session: the persistent-profile one for the default session, the shared one
+    for named sessions (the whole process tree if the browsers cannot be told apart)."""
+    by_profile = await asyncio.to_thread(browser_rss_by_profile)
+    if not by_profile:
+        return await asyncio.to_thread(process_tree_rss)
+    own = os.path.realpath(BROWSER_PROFILE_DIR)
+    if session.name == DEFAULT_SESSION:
+        return by_profile.get(own)
+    return sum(rss for profile, rss in by_profile.items() if profile != own) or None
+
+
+async def _memory_watchdog(session: _Session, page) -> list[str]:
+    """Recycle page or the whole context if over the memory limits. Runs at most every MEMORY_CHECK_SECONDS per
+    session. Returns a description of each recycle (empty if none)."""
+    now = time.monotonic()
+    if now - session.last_memory_check < MEMORY_CHECK_SECONDS:
+        return []
+    session.last_memory_check = now
+    max_rss = _limit_bytes("CLAWFOX_MAX_BROWSER_RSS_MB", DEFAULT_MAX_BROWSER_RSS_MB)
+    max_heap = _limit_bytes("CLAWFOX_MAX_PAGE_HEAP_MB", DEFAULT_MAX_PAGE_HEAP_MB)
+    if max_rss > 0 and now - session.last_rss_recycle >= RSS_RECYCLE_COOLDOWN_SECONDS:
+        rss = await _browser_rss(session)
+        # Skip while the browser is no bigger than a recycle already left it: rebuilding again would free nothing
+        if rss is not None and rss > max_rss and not (session.rss_futile and rss <= session.rss_futile):
+            await session.host.recycle_context(session)
+            session.last_rss_recycle = time.monotonic()
+            after = await _browser_rss(session)
+            session.rss_futile = after if after is not None and after > max_rss else None
+            return [f"context of session {session.name!r} (browser RSS {rss >> 20} MB > {max_rss >> 20} MB)"]
+    if max_heap > 0:
+        try:
+            heap = int(await page.evaluate(PAGE_HEAP_JS) or 0)
+        except Exception:
+            heap = 0
+        if heap > max_heap:
+            url = page.url
+            await _recycle_page(session, page)
+            return [f"page {url} (JS heap {heap >> 20} MB > {max_heap >> 20} MB)"]
+    return []
+
+
+def _session_state_path(name: str) -> str:
+    return os.path.join(SESSIONS_DIR, f"{name}.json")
+
+
+def _screenshot_options(kwargs: dict | None = None) -> dict:
+    """Capture options: the screenshot command's args over the daemon defaults (CLAWFOX_SCREENSHOT_FORMAT,
+    CLAWFOX_SCREENSHOT_QUALITY, CLAWFOX_SCREENSHOT_MAX_WIDTH), which are all implicit screenshots get."""
+    kwargs = kwargs or {}
+    fmt = (kwargs.get("format") or os.environ.get("CLAWFOX_SCREENSHOT_FORMAT") or DEFAULT_SCREENSHOT_FORMAT).lower()
+    fmt = "jpeg" if fmt == "jpg" else fmt
+    if fmt not in SCREENSHOT_FORMATS:
+        raise ValueError(f"unknown screenshot format {fmt!r} (use {', '.join(SCREENSHOT_FORMATS)})")
+    # 0 is a valid quality, so only a missing value falls back to the daemon default
+    quality = kwargs.get("quality")
+    if quality is None:
+        quality = os.environ.get("CLAWFOX_SCREENSHOT_QUALITY") or None
+    max_width = kwargs.get("max_width")
+    if max_width is None:
+        max_width = os.environ.get("CLAWFOX_SCREENSHOT_MAX_WIDTH") or None
+    if max_width is not None and int(max_width) < 1:
+        raise ValueError(f"max-width must be at least 1, got {max_width}")
+    return {
+        "format": fmt,
+        "quality": min(max(int(quality), 0), 100) if quality is not None and fmt != "png" else None,
+        "full_page": bool(kwargs.get("full_page")),
+        "selector": kwargs.get("selector") or None,
+        "max_width": int(max_width) if max_width is not None else None,
+    }
+
+
+def _screenshot_ext(options: dict) -> str:
+    return "jpg" if options["format"] == "jpeg" else options["format"]
+
+
+VIEWPORT_JS = """
+() => ({
+  x: window.scrollX, y: window.scrollY, width: window.innerWidth, height: window.innerHeight,
+  pageWidth: document.documentElement.scrollWidth, pageHeight: document.documentElement.scrollHeight,
+})
+"""
+
+async def _cdp_session(tab: _Tab):
+    if tab.cdp is None:
+        tab.cdp = await tab.page.context.new_cdp_session(tab.page)
+    return tab.cdp
+
 
+async def _capture(tab: _Tab, options: dict) -> bytes:
+    """Encode a screenshot with CDP Page.captureScreenshot (optimizeForSpeed: faster encoder settings, e.g. a
+    lower PNG compression level). Clips to the selector's element or the full page, and scales down to max_width."""
+    page = tab.page
+    clip = None
+    if options["selector"]:
+        locator = page.locator(options["selector"]).first
+        await locator.scroll_into_view_if_needed(timeout=5_000)
+        box = await locator.bounding_box()
+        if box is None:
+            raise ValueError(f"element {options['selector']!r} is not visible")
+        view = await page.evaluate(VIEWPORT_JS)  # box is relative to the viewport; clip is in page coordinates
+        clip = {"x": box["x"] + view["x"], "y": box["y"] + view["y"], "width": box["width"], "height": box["height"]}
+    elif options["full_page"]:
+        view = await page.evaluate(VIEWPORT_JS)
+        clip = {"x": 0, "y": 0, "width": view["pageWidth"], "height": view["pageHeight"]}
+    elif options["max_width"]:
+        view = await page.evaluate(VIEWPORT_JS)
+        clip = {"x": view["x"], "y": view["y"], "width": view["width"], "height": view["height"]}
+    params = {"format": options["format"], "optimizeForSpeed": True}
+    if options["quality"] is not None:
+        params["quality"] = options["quality"]
+    if clip is not None:
+        scale = 1.0
+        if options["max_width"] and clip["width"] > options["max_width"]:
+            scale = options["max_width"] / clip["width"]
+        params["clip"] = dict(clip, scale=scale)
+        params["captureBeyondViewport"] = bool(options["selector"] or options["full_page"])
+    result = await (await _cdp_session(tab)).send("Page.captureScreenshot", params)
+    return base64.b64decode(result["data"])
 
-def _take_screenshot(page) -> str | None:
-    """Take a screenshot, run cleanup, return path or None on failure."""
+
+def _write_and_compare(path: str, data: bytes, previous: tuple | None) -> tuple[str | None, tuple]:
+    # Worker-thread part of _save_screenshot: file I/O, hashing and decoding only, no shared state
+    return compare_screenshots(previous, screenshots.write(path, data), data)
+
+
+async def _save_screenshot(tab: _Tab, path: str, data: bytes, options: dict) -> str | None:
+    """Write a capture and compare it with the tab's previous screenshot taken with the same clip and scale.
+    Returns the change line, or None if there is nothing to compare with. tab.last_screenshot is only touched on
+    the event loop; the work in between runs in a worker thread."""
+    key = (options["selector"], options["full_page"], options["max_width"])
+    last = tab.last_screenshot
+    previous = last[1] if last and last[0] == key else None
+    change, state = await asyncio.to_thread(_write_and_compare, path, data, previous)
+    tab.last_screenshot = (key, state)
+    return change
+
+
+async def _take_screenshot(tab: _Tab, options: dict | None = None) -> tuple[str, str | None]:
+    """Take a screenshot; returns its path and how it differs from the tab's previous one. Raises on failure."""
+    options = options or _screenshot_options()
+    path = screenshots.new_path(_screenshot_ext(options))
+    data = await _capture(tab, options)
+    return path, await _save_screenshot(tab, path, data, options)
+
+
+async def _background_screenshot(tab: _Tab, path: str, options: dict):
+    # Queues on the tab's lock, so no command on the tab runs during the capture. A command already waiting on the
+    # lock (from another connection) goes first, so the capture can show that command's result instead.
     try:
-        os.makedirs(SCREENSHOT_DIR, mode=0o700, exist_ok=True)
-        _screenshot_cleanup()
-        name = f"screenshot_{datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}.png"
-        path = os.path.join(SCREENSHOT_DIR, name)
-        page.screenshot(path=path)
+        async with tab.lock:
+            if tab.page.is_closed():
+                return
+            data = await _capture(tab, options)
+        await _save_screenshot(tab, path, data, options)
+    except Exception:
+        pass
+
+
+def _screenshot_policy(requested: str | None = None) -> str:
+    """Policy for the screenshot a page command takes after its output: the command's own, else
+    CLAWFOX_SCREENSHOTS, else the default. "off" is accepted for "on-demand"."""
+    policy = requested or os.environ.get("CLAWFOX_SCREENSHOTS") or DEFAULT_SCREENSHOT_POLICY
+    policy = "on-demand" if policy == "off" else policy
+    if policy not in SCREENSHOT_POLICIES:
+        raise ValueError(f"unknown screenshot policy {policy!r} (use {', '.join(SCREENSHOT_POLICIES)} or off)")
+    return policy
+
+
+async def _implicit_screenshot(tab: _Tab, policy: str) -> str | None:
+    """Screenshot after a page command: taken now ("sync"), handed to a background task whose path is returned
+    before the file exists ("async"), or none ("on-demand": only the screenshot command takes one). Returns the
+    path, followed by the change since the previous screenshot when it is known."""
+    if policy == "sync":
+        try:
+            path, change = await _take_screenshot(tab)
+        except Exception:
+            return None
+        return f"{path} ({change})" if change else path
+    if policy == "async":
+        try:
+            options = _screenshot_options()
+            path = screenshots.new_path(_screenshot_ext(options))
+        except (OSError, ValueError):
+            return None
+        pending = tab.session.host.pending_screenshots
+        task = asyncio.create_task(_background_screenshot(tab, path, options))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
         return path
+    return None
+
+
+def _converter() -> str:
+    name = os.environ.get("CLAWFOX_CONVERTER") or DEFAULT_CONVERTER
+    if name not in CONVERTERS:
+        raise ValueError(f"unknown converter {name!r} (use {' or '.join(CONVERTERS)})")
+    return name
+
+
+async def _list_elements(tab: _Tab, js: str, args: dict) -> dict:
+    """Evaluate an element-listing script (INTERACTIVE_ELEMENTS_JS, MAIN_HTML_JS, PAGE_MARKDOWN_JS) so that refs
+    it hands out are numbered after every ref handed out before, in any tab or document."""
+    host = tab.session.host
+    result = await tab.page.evaluate(js, {**args, "refStart": host.next_ref})
+    host.next_ref = max(host.next_ref, result.get("nextRef") or 1)
+    return result
+
+
+async def _selector(page, selector: str) -> str:
+    """Playwright selector for a command's selector argument. An element ref from an element list (@N) resolves
+    through the ref engine; a stale one (element removed, or listed in an earlier document, whose numbers the
+    current document never reuses) fails at once rather than timing out."""
+    match = ELEMENT_REF_RE.match(selector.strip())
+    if match is None:
+        return selector
+    if not await page.evaluate(REF_ALIVE_JS, int(match.group(1))):
+        raise ValueError(
+            f"{selector.strip()} is stale (the page navigated or the element is gone); list elements again with show"
+        )
+    return f"{REF_SELECTOR_ENGINE}={match.group(1)}"
+
+
+def _max_elements() -> int | None:
+    """Elements listed per output (CLAWFOX_MAX_ELEMENTS), or None for all."""
+    value = int(os.environ.get("CLAWFOX_MAX_ELEMENTS") or DEFAULT_MAX_ELEMENTS)
+    return value if value > 0 else None
+
+
+async def _snapshot(
+    tab: _Tab, converter: str, main: bool = False, max_chars: int | None = None
+) -> tuple[str, list[dict], int | None]:
+    """(markdown, interactive elements, total elements on the page) of the page, or (HTML, [], 0) for the "html"
+    converter. Elements are listed viewport first, up to _max_elements(). With main, only the main content region
+    and the elements inside it. The "ax" converter gives the accessibility-tree outline and all its widgets. With
+    max_chars, the builtin converter stops once it has that much markdown."""
+    if converter == "ax":
+        # One CDP call; the tree is already pruned of presentational markup, and its roles and names are selectors
+        tree = await (await _cdp_session(tab)).send("Accessibility.getFullAXTree", {})
+        outline, elements = await asyncio.to_thread(build_ax_output, tree["nodes"])
+        return outline, elements, None
+    limit = _max_elements()
+    if converter == "page":
+        snapshot = await _list_elements(tab, PAGE_MARKDOWN_JS, {"mainOnly": main, "limit": limit})
+        return snapshot["markdown"], snapshot["elements"], snapshot["total"]
+    if main:
+        snapshot = await _list_elements(tab, MAIN_HTML_JS, {"limit": limit})
+        html = snapshot["html"]
+    else:
+        html = await tab.page.content()
+        snapshot = None
+    if converter == "html":
+        return html, [], 0
+    if snapshot is None:
+        snapshot = await _list_elements(tab, INTERACTIVE_ELEMENTS_JS, {"limit": limit})
+    # HTML->markdown is CPU work; keep it off the event loop so other connections are served meanwhile
+    markdown = await asyncio.to_thread(html_to_markdown, html, converter == "builtin", max_chars)
+    return markdown, snapshot["elements"], snapshot["total"]
+
+
+def _page_bounds(text: str, page_chars: int) -> list[tuple[int, int]]:
+    """(start, end) offsets of the pages of text, each at most page_chars long, preferring to cut between blocks,
+    then between lines. Works on offsets so a long text is scanned once, not copied per page."""
+    bounds = []
+    start, size = 0, len(text)
+    while size - start > page_chars:
+        limit = start + page_chars
+        cut = text.rfind("\n\n", start, limit)
+        if cut - start < page_chars // 2:
+            cut = text.rfind("\n", start, limit)
+        if cut - start < page_chars // 2:
+            cut = limit
+        end = cut
+        while end > start and text[end - 1] == "\n":
+            end -= 1
+        bounds.append((start, end))
+        start = cut
+        while start < size and text[start] == "\n":
+            start += 1
+    bounds.append((start, size))
+    return bounds
+
+
+def _store_output(tab: _Tab, text: str, page_chars: int):
+    """Keep text as the tab's last output for show --page, split into pages of page_chars once, here."""
+    tab.output = (text, page_chars, _page_bounds(text, page_chars))
+
+
+def _stored_page(tab: _Tab, number: int, max_chars: int | None = None) -> str:
+    """Page number (1-based) of the tab's last output, with a footer naming the next page (and the session, if not
+    the default one). Nothing is re-read from the browser. max_chars re-splits the stored text with a new page size."""
+    if tab.output is None:
+        raise ValueError("no output stored for this tab yet; run go or show first")
+    text, page_chars, bounds = tab.output
+    if max_chars and max_chars != page_chars:
+        _store_output(tab, text, max_chars)
+        text, page_chars, bounds = tab.output
+    if not 1 <= number <= len(bounds):
+        raise ValueError(f"page {number} out of range (this output has {len(bounds)})")
+    start, end = bounds[number - 1]
+    body = text[start:end]
+    if len(bounds) == 1:
+        return body
+    footer = f"[page {number} of {len(bounds)}"
+    if number < len(bounds):
+        name = tab.session.name
+        option = f"--session {name} " if name != DEFAULT_SESSION else ""
+        footer += f"; continue with: clawfox {option}show --page {number + 1}"
+    return f"{body.rstrip()}\n\n{footer}]\n"
+
+
+def _max_chars(kwargs: dict) -> int | None:
+    """Output budget from max_chars or max_tokens, or None for no limit."""
+    for key, scale in (("max_chars", 1), ("max_tokens", CHARS_PER_TOKEN)):
+        if kwargs.get(key) is not None:
+            value = int(kwargs[key])
+            if value < 1:
+                raise ValueError(f"{key.replace('_', '-')} must be at least 1, got {value}")
+            return value * scale
+    return None
+
+
+async def _page_output(
+    tab: _Tab,
+    as_html: bool = False,
+    diff: bool = False,
+    max_chars: int | None = None,
+    main: bool = False,
+    screenshot: str | None = None,
+    ax: bool = False,
+    truncate: bool = False,
+) -> str:
+    """Current page as markdown + interactive elements (or HTML), followed by a screenshot path. With diff, only
+    the blocks and elements that changed since this page's previous output in the same mode and document (the full
+    output if there was none). With max_chars, only the first page of the output; the whole text is kept for _stored_page.
+    With truncate as well, the output is cut at max_chars instead, so there are no further pages and the builtin
+    converter stops at the budget rather than converting the whole page. With main, only the main content region
+    (reader mode). With ax, the accessibility-tree outline instead of markdown. screenshot overrides the screenshot
+    policy.
+
+    The snapshot is cached per tab and reused while the document, URL and DOM generation are unchanged.
+    """
+    if as_html and diff:
+        raise ValueError("--diff works on markdown; it cannot be combined with --html")
+    if ax and (as_html or main):
+        raise ValueError("--ax cannot be combined with --html or --main")
+    policy = _screenshot_policy(screenshot)
+    converter = "html" if as_html else "ax" if ax else _converter()
+    budget = max_chars if truncate and not as_html else None
+    mode = converter + ("+main" if main else "") + (f"+cut{budget}" if budget else "")
+    try:
+        key = tuple(await tab.page.evaluate(DOM_GENERATION_JS))
     except Exception:
-        return None
+        key = None  # e.g. navigating; just don't cache
+    prev = tab.snapshot
+    if key is not None and prev is not None and prev[:2] == (key, mode):
+        body, elements, total = prev[2:]
+    else:
+        body, elements, total = await _snapshot(tab, converter, main, budget)
+        tab.snapshot = (key, mode, body, elements, total)
+    if as_html:
+        out = body
+    elif diff and prev is not None and prev[1] == mode:
+        if key is not None and prev[0] is not None and prev[0][:2] == key[:2]:
+            out = build_diff_output(prev[2], prev[3], body, elements)
+        else:
+            # Another document (or URL): a diff would remove every old block and add every new one
+            out = "(new document, no diff)\n\n" + build_markdown_output(body, elements, total)
+    else:
+        out = build_markdown_output(body, elements, total)
+    if truncate and max_chars and len(out) > max_chars:
+        start, end = _page_bounds(out, max_chars)[0]
+        out = f"{out[start:end].rstrip()}\n\n[truncated at {max_chars} chars]\n"
+    _store_output(tab, out, max_chars or DEFAULT_PAGE_CHARS)
+    if max_chars and not truncate:
+        out = _stored_page(tab, 1)
+    path = await _implicit_screenshot(tab, policy)
+    if path:
+        out = f"{out}\n\nScreenshot: {path}"
+    return out
+
 
+async def _run_cmd(session: _Session, cmd: str, **kwargs) -> dict:
+    """Execute one command in a session; returns {ok: bool, output?: str, error?: str}.
+
+    Page commands hold the lock of the page they drive for their whole duration.
+    """
+    if cmd == "run":
+        return await _run_script(session, kwargs.get("steps") or [], kwargs.get("keep_going", False))
+    if cmd in CONTEXT_COMMANDS:
+        return await _exec_cmd(session, session.current_page_ref[0], cmd, **kwargs)
+    override = None
+    if kwargs.get("block") is not None:
+        try:
+            override = _block_types(kwargs["block"])
+            if "ads" in override:
+                await _load_blocklist()
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+    return await _run_page_cmd(session, cmd, override, **kwargs)
 
-def _run_cmd(context, current_page_ref, cmd: str, **kwargs) -> dict:
-    """Execute one command; returns {ok: bool, output?: str, error?: str}. current_page_ref is [page] so we can switch tabs."""
-    page = current_page_ref[0]
+
+async def _run_page_cmd(session: _Session, cmd: str, override: frozenset | None = None, **kwargs) -> dict:
+    """Run a page command under its page's lock. override (the command's --block) replaces the session's list for
+    that page's requests while the command runs; commands on other tabs keep their own."""
+    blocked_before = Counter(session.blocked)
+    recycled = []
+    while True:
+        page = session.current_page_ref[0]
+        async with session.tab(page).lock:
+            if page.is_closed() and session.current_page_ref[0] is not page:
+                continue  # recycled while we waited for the lock; drive its replacement
+            if not recycled:  # one check per command, so a page that is already big when fresh cannot loop
+                recycled = await _memory_watchdog(session, page)
+                if recycled:
+                    continue  # run the command on the fresh page, under its own lock
+            if override is None:
+                result = await _exec_cmd(session, page, cmd, **kwargs)
+            else:
+                session.block_overrides[page] = override
+                try:
+                    await session.update_route()
+                    result = await _exec_cmd(session, page, cmd, **kwargs)
+                finally:
+                    session.block_overrides.pop(page, None)
+                    await session.update_route()
+        if recycled:
+            result["recycled"] = recycled
+        blocked = session.blocked - blocked_before  # includes other tabs' requests meanwhile
+        if blocked:
+            result["blocked"] = _blocked_summary(blocked)
+        return result
+
+
+async def _exec_cmd(session: _Session, page, cmd: str, **kwargs) -> dict:
+    tab = session.tab(page)
     try:
         if cmd == "tabs":
-            pages = context.pages
-            out = json.dumps([{"url": p.url, "title": p.title()} for p in pages], indent=2)
+            pages = session.ordered_pages()
+            out = json.dumps([{"url": p.url, "title": await p.title()} for p in pages], indent=2)
             return {"ok": True, "output": out}
 
         if cmd == "focus_tab":
             substring = (kwargs.get("url_contains") or kwargs.get("substring") or "").strip()
             if not substring:
                 return {"ok": False, "error": "focus_tab requires url_contains (or substring)"}
-            for p in context.pages:
+            for p in session.ordered_pages():
                 if substring in p.url:
-                    p.bring_to_front()
-                    current_page_ref[0] = p
+                    await p.bring_to_front()
+                    session.current_page_ref[0] = p
                     return {"ok": True, "output": p.url}
             return {"ok": False, "error": f"no tab URL contains {substring!r}"}
 
@@ -108,62 +971,80 @@ def _run_cmd(context, current_page_ref, cmd: str, **kwargs) -> dict:
             url = kwargs.get("url", "")
             timeout = int(kwargs.get("timeout_ms", DEFAULT_GO_TIMEOUT_MS))
             as_html = kwargs.get("html", False)
-            page.goto(url, wait_until="domcontentloaded", timeout=timeout)
-            html = page.content()
-            elements = page.evaluate(INTERACTIVE_ELEMENTS_JS)
-            out = build_go_output(html, elements, as_html=as_html)
-            path = _take_screenshot(page)
-            if path:
-                out = f"{out}\n\nScreenshot: {path}"
+            await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            main = kwargs.get("main", False)
+            out = await _page_output(
+                tab,
+                as_html=as_html,
+                max_chars=_max_chars(kwargs),
+                main=main,
+                screenshot=kwargs.get("screenshot"),
+                ax=kwargs.get("ax", False),
+                truncate=kwargs.get("truncate", False),
+            )
             return {"ok": True, "output": out}
 
         if cmd == "show":
+            if kwargs.get("page_number") is not None:
+                return {"ok": True, "output": _stored_page(tab, int(kwargs["page_number"]), _max_chars(kwargs))}
             as_html = kwargs.get("html", False)
-            html = page.content()
-            elements = page.evaluate(INTERACTIVE_ELEMENTS_JS)
-            out = build_go_output(html, elements, as_html=as_html)
-            path = _take_screenshot(page)
-            if path:
-                out = f"{out}\n\nScreenshot: {path}"
+            diff = kwargs.get("diff", False)
+            main = kwargs.get("main", False)
+            out = await _page_output(
+                tab,
+                as_html=as_html,
+                diff=diff,
+                max_chars=_max_chars(kwargs),
+                main=main,
+                screenshot=kwargs.get("screenshot"),
+                ax=kwargs.get("ax", False),
+                truncate=kwargs.get("truncate", False),
+            )
             return {"ok": True, "output": out}
 
         if cmd == "eval":
             js = kwargs.get("js", "")
-            result = page.evaluate(f"() => {{ return ({js}); }}")
+            result = await page.evaluate(f"() => {{ return ({js}); }}")
+            tab.invalidate_snapshot()
             # Serialise for JSON (Playwright returns JSON-serialisable values)
             return {"ok": True, "output": json.dumps(result, default=str)}
 
         if cmd == "screenshot":
-            path = _take_screenshot(page)
-            return {"ok": True, "output": path or "(screenshot failed)"}
+            if kwargs.get("selector"):
+                kwargs["selector"] = await _selector(page, kwargs["selector"])
+            path, change = await _take_screenshot(tab, _screenshot_options(kwargs))
+            return {"ok": True, "output": f"{path}\n{change}" if change else path}
+
+        if cmd == "elements":
+            offset = max(int(kwargs.get("offset") or 0), 0)
+            limit = int(kwargs["limit"]) if kwargs.get("limit") else _max_elements()
+            result = await _list_elements(tab, INTERACTIVE_ELEMENTS_JS, {"offset": offset, "limit": limit})
+            out = format_interactive_elements(result["elements"], result["total"], offset)
+            return {"ok": True, "output": out or f"No interactive elements past {offset} (page has {result['total']})."}
 
         if cmd == "click":
-            selector = kwargs.get("selector", "")
+            selector = await _selector(page, kwargs.get("selector", ""))
             timeout = int(kwargs.get("timeout_ms", 10_000))
-            page.click(selector, timeout=timeout)
+            await page.click(selector, timeout=timeout)
+            tab.invalidate_snapshot()
             # Optional: wait for navigation and return new content
             try:
-                page.wait_for_load_state("domcontentloaded", timeout=2000)
+                await page.wait_for_load_state("domcontentloaded", timeout=2000)
             except Exception:
                 pass
-            html = page.content()
-            elements = page.evaluate(INTERACTIVE_ELEMENTS_JS)
-            out = build_go_output(html, elements, as_html=False)
-            path = _take_screenshot(page)
-            if path:
-                out = f"{out}\n\nScreenshot: {path}"
+            out = await _page_output(tab, diff=kwargs.get("diff", False), screenshot=kwargs.get("screenshot"))
             return {"ok": True, "output": out}
 
         if cmd == "select":
-            selector = kwargs.get("selector", "")
+            selector = await _selector(page, kwargs.get("selector", ""))
             timeout = int(kwargs.get("timeout_ms", 5_000))
             loc = page.locator(selector)
-            count = loc.count()
+            count = await loc.count()
             lines = [f"count: {count}"]
             for i in range(min(count, 20)):
                 try:
                     el = loc.nth(i)
-                    info = el.evaluate(
+                    info = await el.evaluate(
                         """el => ({
                         tag: el.tagName.toLowerCase(),
                         id: el.id || null,
@@ -175,61 +1056,70 @@ def _run_cmd(context, current_page_ref, cmd: str, **kwargs) -> dict:
                     lines.append(f"  [{i}] {info}")
                 except Exception as e:
                     lines.append(f"  [{i}] error: {e}")
+            tab.invalidate_snapshot()  # the probes run page JS
             return {"ok": True, "output": "\n".join(lines)}
 
         if cmd == "type":
-            selector = kwargs.get("selector", "")
+            selector = await _selector(page, kwargs.get("selector", ""))
             text = kwargs.get("text", "")
             timeout = int(kwargs.get("timeout_ms", 10_000))
-            page.locator(selector).first.click(timeout=timeout)
-            page.keyboard.type(text, delay=0)
+            await page.locator(selector).first.click(timeout=timeout)
+            await page.keyboard.type(text, delay=0)
+            tab.invalidate_snapshot()
             return {"ok": True, "output": "ok"}
 
         if cmd == "fill":
-            selector = kwargs.get("selector", "")
+            selector = await _selector(page, kwargs.get("selector", ""))
             text = kwargs.get("text", "")
             timeout = int(kwargs.get("timeout_ms", 10_000))
-            page.fill(selector, text, timeout=timeout)
+            await page.fill(selector, text, timeout=timeout)
+            tab.invalidate_snapshot()
             return {"ok": True, "output": "ok"}
 
         if cmd == "wait":
-            selector = kwargs.get("selector", "")
+            selector = await _selector(page, kwargs.get("selector", ""))
             timeout = int(kwargs.get("timeout_ms", 30_000))
-            page.wait_for_selector(selector, state="visible", timeout=timeout)
+            await page.wait_for_selector(selector, state="visible", timeout=timeout)
             return {"ok": True, "output": "ok"}
 
         if cmd == "url":
             return {"ok": True, "output": page.url}
 
         if cmd == "back":
-            page.go_back(wait_until="domcontentloaded")
-            html = page.content()
-            elements = page.evaluate(INTERACTIVE_ELEMENTS_JS)
-            out = build_go_output(html, elements, as_html=False)
-            path = _take_screenshot(page)
-            if path:
-                out = f"{out}\n\nScreenshot: {path}"
-            return {"ok": True, "output": out}
+            await page.go_back(wait_until="domcontentloaded")
+            return {"ok": True, "output": await _page_output(tab, screenshot=kwargs.get("screenshot"))}
 
         if cmd == "forward":
-            page.go_forward(wait_until="domcontentloaded")
-            html = page.content()
-            elements = page.evaluate(INTERACTIVE_ELEMENTS_JS)
-            out = build_go_output(html, elements, as_html=False)
-            path = _take_screenshot(page)
-            if path:
-                out = f"{out}\n\nScreenshot: {path}"
-            return {"ok": True, "output": out}
+            await page.go_forward(wait_until="domcontentloaded")
+            return {"ok": True, "output": await _page_output(tab, screenshot=kwargs.get("screenshot"))}
 
         if cmd == "reload":
-            page.reload(wait_until="domcontentloaded")
-            html = page.content()
-            elements = page.evaluate(INTERACTIVE_ELEMENTS_JS)
-            out = build_go_output(html, elements, as_html=False)
-            path = _take_screenshot(page)
-            if path:
-                out = f"{out}\n\nScreenshot: {path}"
-            return {"ok": True, "output": out}
+            await page.reload(wait_until="domcontentloaded")
+            return {"ok": True, "output": await _page_output(tab, screenshot=kwargs.get("screenshot"))}
+
+        if cmd == "block":
+            if kwargs.get("types") is not None:
+                types = _block_types(kwargs["types"])
+                if "ads" in types:
+                    await _load_blocklist()
+                session.block = types
+                await session.update_route()
+            names = [name for name, kind in BLOCKABLE_RESOURCES.items() if kind in session.block]
+            lines = [f"blocking: {', '.join(names) or 'nothing'}"]
+            if session.blocked:
+                lines.append(f"blocked in this session: {_blocked_summary(session.blocked)}")
+            if blocklist.loaded:
+                lines.append(blocklist.summary())
+            return {"ok": True, "output": "\n".join(lines)}
+
+        if cmd == "sessions":
+            return {"ok": True, "output": json.dumps(session.host.describe_sessions(), indent=2)}
+
+        if cmd == "close_session":
+            if session.name == DEFAULT_SESSION:
+                return {"ok": False, "error": "the default session cannot be closed (use stop)"}
+            await session.host.close_session(session.name)
+            return {"ok": True, "output": f"closed session {session.name}"}
 
         if cmd == "stop":
             return {"ok": True, "output": "stopping", "stop": True}
@@ -239,115 +1129,181 @@ def _run_cmd(context, current_page_ref, cmd: str, **kwargs) -> dict:
         return {"ok": False, "error": str(e)}
 
 
-def run_daemon():
-    """Run the browser and socket server until stop or SIGTERM."""
-    _write_pid()
-    stop_requested = [False]  # ref so handler can set it
+async def _run_script(session: _Session, steps: list, keep_going: bool) -> dict:
+    """Run a list of {cmd, args, line?} steps in order. Returns one response with per-step results and timings;
+    unless keep_going, steps after the first failure are skipped."""
+    results = []
+    recycled = []
+    stop = False
+    failed = 0
+    start = time.perf_counter()
+    for i, step in enumerate(steps):
+        cmd = step.get("cmd", "")
+        label = step.get("line") or cmd
+        if (failed and not keep_going) or stop:
+            results.append({"step": i + 1, "line": label, "ok": False, "skipped": True})
+            continue
+        t0 = time.perf_counter()
+        if cmd == "run":
+            res = {"ok": False, "error": "run cannot be nested"}
+        else:
+            res = await _run_cmd(session, cmd, **(step.get("args") or {}))
+        ms = round((time.perf_counter() - t0) * 1000, 1)
+        entry = {"step": i + 1, "line": label, "ok": bool(res.get("ok")), "ms": ms}
+        if res.get("ok"):
+            entry["output"] = res.get("output", "")
+        else:
+            entry["error"] = res.get("error", "unknown error")
+            failed += 1
+        if res.get("recycled"):
+            entry["recycled"] = res["recycled"]
+            recycled += res["recycled"]
+        results.append(entry)
+        if res.get("stop"):
+            stop = True
+    total_ms = round((time.perf_counter() - start) * 1000, 1)
 
-    def on_signal(_signum, _frame):
-        stop_requested[0] = True
+    n = len(results)
+    parts = []
+    for r in results:
+        if r.get("skipped"):
+            parts.append(f"[{r['step']}/{n}] {r['line']} - skipped")
+            continue
+        status = "ok" if r["ok"] else "FAILED"
+        body = r.get("output", "") if r["ok"] else f"error: {r['error']}"
+        parts.append(f"[{r['step']}/{n}] {r['line']} - {status} ({r['ms']} ms)\n{body}".rstrip())
+    skipped = sum(1 for r in results if r.get("skipped"))
+    parts.append(f"{n - failed - skipped} of {n} steps ok, {failed} failed, {skipped} skipped; total {total_ms} ms")
+    result = {"ok": True, "output": "\n\n".join(parts), "steps": results, "failed": failed, "ms": total_ms}
+    if recycled:
+        result["recycled"] = recycled
+    if stop:
+        result["stop"] = True
+    return result
 
-    signal.signal(signal.SIGTERM, on_signal)
-    signal.signal(signal.SIGINT, on_signal)
 
-    if os.path.exists(SOCKET_PATH):
-        try:
-            os.unlink(SOCKET_PATH)
-        except OSError:
-            pass
-    os.makedirs(RUN_DIR, mode=0o700, exist_ok=True)
-    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+async def _handle_line(host: _BrowserHost, line: bytes) -> tuple[dict, object]:
+    """Decode one request line and run it. Returns the result and the request id (None if it had none)."""
+    req_id = None
+    host.active_requests += 1
     try:
-        sock.bind(SOCKET_PATH)
-    except OSError as e:
-        _delete_pid()
-        sys.exit(f"clawfox daemon: could not bind socket (another daemon may be running): {e}")
-    sock.listen(1)
+        req_id, cmd, args, name = parse_request(line)
+        # stop and sessions are daemon-wide; don't open a context just to answer them
+        if cmd == "stop":
+            result = {"ok": True, "output": "stopping", "stop": True}
+        elif cmd == "sessions":
+            result = {"ok": True, "output": json.dumps(host.describe_sessions(), indent=2)}
+        elif cmd == "close_session" and name in host.suspended_tabs and name != DEFAULT_SESSION:
+            # Suspended: its storage state was saved at suspend time, so just forget its tabs; no relaunch
+            await host.close_session(name)
+            result = {"ok": True, "output": f"closed session {name}"}
+        elif cmd == "close_session" and name not in host.sessions:
+            result = {"ok": False, "error": f"no open session named {name!r}"}
+        else:
+            result = await _run_cmd(await host.session(name), cmd, **args)
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    finally:
+        host.active_requests -= 1
+        host.last_activity = time.monotonic()
+    return result, req_id
 
-    headful = os.environ.get("CLAWFOX_HEADFUL", "").strip().lower() in ("1", "true", "yes")
-    # Build UA/headers from default version (persistent context has no browser until after launch)
-    _fake_browser = type("_FakeBrowser", (), {"version": "131.0.0.0"})()
-    user_agent, extra_headers, chrome_major = _chrome_version_headers(_fake_browser)
-    with sync_playwright() as p:
-        context = p.chromium.launch_persistent_context(
-            BROWSER_PROFILE_DIR,
-            headless=not headful,
-            user_agent=user_agent,
-            extra_http_headers=extra_headers,
-        )
-        # Make navigator.userAgentData look like desktop Chrome (reduces "headless" detection)
+
+async def _serve_connection(reader, writer, host: _BrowserHost, stop_event: asyncio.Event):
+    """Serve request lines from one client until it disconnects."""
+    try:
+        while not stop_event.is_set():
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Line longer than MAX_REQUEST_BYTES (the stream limit)
+                writer.write(response_line({"ok": False, "error": "request too large"}))
+                await writer.drain()
+                break
+            if not line:
+                break
+            if not line.strip():
+                continue
+            result, req_id = await _handle_line(host, line)
+            writer.write(response_line(result, req_id))
+            await writer.drain()
+            if result.get("stop"):
+                stop_event.set()
+    except (ConnectionError, OSError):
+        pass
+    finally:
         try:
-            context.add_init_script(
-                f"""
-                try {{
-                    Object.defineProperty(navigator, 'userAgentData', {{
-                        get: () => ({{
-                            brands: [
-                                {{ brand: 'Chromium', version: '{chrome_major}' }},
-                                {{ brand: 'Google Chrome', version: '{chrome_major}' }},
-                                {{ brand: 'Not_A Brand', version: '24' }}
-                            ],
-                            mobile: false,
-                            platform: 'Linux'
-                        }}),
-                        configurable: true
-                    }});
-                }} catch (e) {{}}
-                """
-            )
+            writer.close()
         except Exception:
             pass
-        # Use first existing page or create one (persistent context can have existing pages from last run)
-        if context.pages:
-            first_page = context.pages[0]
-        else:
-            first_page = context.new_page()
-        current_page_ref = [first_page]  # mutable so focus_tab can switch which tab we drive
 
-        try:
-            while not stop_requested[0]:
-                sock.settimeout(1.0)
-                try:
-                    conn, _ = sock.accept()
-                except socket.timeout:
-                    continue
-                except OSError:
-                    break
-                try:
-                    buf = b""
-                    while b"\n" not in buf and len(buf) < 1_000_000:
-                        chunk = conn.recv(4096)
-                        if not chunk:
-                            break
-                        buf += chunk
-                    line = buf.decode("utf-8", errors="replace").split("\n", 1)[0]
-                    req = json.loads(line)
-                    cmd = req.get("cmd", "")
-                    args = req.get("args", req)
-                    result = _run_cmd(context, current_page_ref, cmd, **args)
-                    if result.get("stop"):
-                        stop_requested[0] = True
-                    conn.send((json.dumps(result) + "\n").encode("utf-8"))
-                except Exception as e:
-                    try:
-                        conn.send((json.dumps({"ok": False, "error": str(e)}) + "\n").encode("utf-8"))
-                    except Exception:
-                        pass
-                finally:
-                    try:
-                        conn.close()
-                    except Exception:
-                        pass
 
+async def _serve(sock: socket.socket, default_session: bool, ready_fd: int | None):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    headful = os.environ.get("CLAWFOX_HEADFUL", "").strip().lower() in ("1", "true", "yes")
+    idle_seconds = float(os.environ.get("CLAWFOX_IDLE_MINUTES") or DEFAULT_IDLE_MINUTES) * 60
+    host = _BrowserHost(headful, default_session=default_session)
+    try:
+        if default_session:
+            await host.session(DEFAULT_SESSION)
+        server = await asyncio.start_unix_server(
+            lambda r, w: _serve_connection(r, w, host, stop_event),
+            sock=sock,
+            limit=MAX_REQUEST_BYTES,
+        )
+        signal_ready(ready_fd)
+
+        async def suspend_when_idle():
+            while True:
+                await asyncio.sleep(min(60.0, max(1.0, idle_seconds / 4)))
+                await host.suspend_if_idle(idle_seconds)
+
+        idle_task = asyncio.create_task(suspend_when_idle()) if idle_seconds > 0 else None
+        # Only the worker owning the default session (or a lone daemon) picks up files from earlier runs
+        sweeper = asyncio.create_task(screenshots.run_sweeper(scan=default_session))
+        try:
+            await stop_event.wait()
         finally:
-            context.close()
+            if idle_task is not None:
+                idle_task.cancel()
+            sweeper.cancel()
+            server.close()
+            # Finish screenshots whose paths were already handed out
+            await asyncio.gather(*host.pending_screenshots, return_exceptions=True)
+    finally:
+        await host.close()
+
+
+def run_daemon(socket_path: str = SOCKET_PATH, pidfile_path: str | None = PIDFILE_PATH, default_session: bool = True):
+    """Run the browser and socket server until stop or SIGTERM.
 
+    Pool workers pass their own socket_path, no pidfile, and default_session=False unless they are the worker
+    that owns the persistent profile.
+    """
+    ready_fd = take_ready_fd()
+    if pidfile_path:
+        write_pid(pidfile_path)
     try:
-        sock.close()
-    except Exception:
-        pass
+        sock = bind_socket(socket_path)
+    except OSError as e:
+        if pidfile_path:
+            delete_pid(pidfile_path)
+        sys.exit(f"clawfox daemon: could not bind socket (another daemon may be running): {e}")
+
     try:
-        os.unlink(SOCKET_PATH)
-    except OSError:
-        pass
-    _delete_pid()
+        asyncio.run(_serve(sock, default_session, ready_fd))
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+        if pidfile_path:
+            delete_pid(pidfile_path)
@@ -0,0 +1,174 @@
+"""Chromium launch profiles and browser process measurement."""
+from __future__ import annotations
+
+import os
+
+from ._paths import DEFAULT_MAX_PAGE_HEAP_MB
+
+# Flags that cut work Chromium does at start-up and in the background. Playwright already passes some of these;
+# repeating a switch is harmless. Not --disable-features: Playwright passes its own list and a second one replaces it.
+_FAST_START_ARGS = [
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-extensions",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--disable-domain-reliability",
+    "--disable-gpu",
+    "--disable-gpu-compositing",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+]
+
+LAUNCH_PROFILES = {
+    "default": {"args": []},
+    "fast-start": {"args": _FAST_START_ARGS},
+    "low-memory": {
+        "args": _FAST_START_ARGS
+        + [
+            "--renderer-process-limit=2",
+            "--disable-site-isolation-trials",
+            "--disk-cache-size=33554432",
+            "--media-cache-size=1048576",
+        ],
+        "cap_js_heap": True,
+    },
+}
+DEFAULT_LAUNCH_PROFILE = "default"
+
+# V8 old-space cap for profiles with cap_js_heap, above the watchdog's page heap limit (CLAWFOX_MAX_PAGE_HEAP_MB) so
+# the watchdog replaces a growing page before V8 kills its renderer with an out-of-memory error
+_JS_HEAP_HEADROOM_MB = 256
+
+
+def _js_heap_cap_mb() -> int:
+    heap_mb = float(os.environ.get("CLAWFOX_MAX_PAGE_HEAP_MB") or DEFAULT_MAX_PAGE_HEAP_MB) or DEFAULT_MAX_PAGE_HEAP_MB
+    return int(heap_mb + max(_JS_HEAP_HEADROOM_MB, heap_mb / 2))
+
+
+# Playwright channel for each CLAWFOX_HEADLESS mode. "shell" = chromium-headless-shell (old headless; smaller, starts
+# faster), which is what Playwright launches for headless by default; "new" = full Chromium in new headless mode
+# (closest to a real browser), which Playwright only launches from 1.49 on.
+_HEADLESS_CHANNELS = {"shell": None, "new": "chromium"}
+_NEW_HEADLESS_MIN_PLAYWRIGHT = (1, 49)
+
+
+def _playwright_version() -> tuple[int, ...] | None:
+    # Imported here: importlib.metadata is slow to load and the CLI client imports this module for the profile names.
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return tuple(int(part) for part in version("playwright").split(".")[:2])
+    except (PackageNotFoundError, ValueError):
+        return None
+
+
+def launch_options(profile: str | None = None, headful: bool = False) -> dict:
+    """Keyword arguments for chromium.launch / launch_persistent_context for a named profile.
+
+    profile defaults to CLAWFOX_LAUNCH_PROFILE (or "default"); CLAWFOX_HEADLESS=shell|new picks the headless browser
+    for any profile. Raises ValueError for an unknown profile or mode, or for "new" on a Playwright older than 1.49.
+    """
+    name = profile or os.environ.get("CLAWFOX_LAUNCH_PROFILE") or DEFAULT_LAUNCH_PROFILE
+    if name not in LAUNCH_PROFILES:
+        raise ValueError(f"unknown launch profile {name!r} (choose from {', '.join(LAUNCH_PROFILES)})")
+    spec = LAUNCH_PROFILES[name]
+    opts = {"headless": not headful}
+    if spec["args"]:
+        opts["args"] = list(spec["args"])
+    if spec.get("cap_js_heap"):
+        opts.setdefault("args", []).append(f"--js-flags=--max-old-space-size={_js_heap_cap_mb()}")
+    mode = os.environ.get("CLAWFOX_HEADLESS")
+    if mode and not headful:
+        if mode not in _HEADLESS_CHANNELS:
+            raise ValueError(f"unknown headless mode {mode!r} (use shell or new)")
+        if mode == "new":
+            found = _playwright_version()
+            if found is not None and found < _NEW_HEADLESS_MIN_PLAYWRIGHT:
+                raise ValueError(
+                    f"CLAWFOX_HEADLESS=new needs Playwright 1.49 or later (found {'.'.join(map(str, found))})"
+                )
+        if _HEADLESS_CHANNELS[mode]:
+            opts["channel"] = _HEADLESS_CHANNELS[mode]
+    return opts
+
+
+def _children(pid: int) -> list[int]:
+    # Children are listed per thread; any thread of the process may have started one
+    out = []
+    try:
+        tids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return out
+    for tid in tids:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                out.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            pass
+    return out
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _cmdline(pid: int) -> list[str]:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().decode("utf-8", errors="replace").split("\0")
+    except OSError:
+        return []
+
+
+def browser_rss_by_profile(pid: int | None = None) -> dict[str, int] | None:
+    """Resident memory (bytes) of each browser started under pid (the Playwright driver's Chromiums), keyed by its
+    --user-data-dir (real path): the browser process and all of its children. A browser is a process with a
+    --user-data-dir and no --type (renderer, GPU and utility processes have one). None where /proc is unavailable."""
+    pid = pid or os.getpid()
+    if not os.path.exists(f"/proc/{pid}/status"):
+        return None
+    out: dict[str, int] = {}
+    stack = _children(pid)
+    seen = set()
+    while stack:
+        child = stack.pop()
+        if child in seen:
+            continue
+        seen.add(child)
+        args = _cmdline(child)
+        profile = next((a.split("=", 1)[1] for a in args if a.startswith("--user-data-dir=")), None)
+        if profile is not None and not any(a.startswith("--type=") for a in args):
+            key = os.path.realpath(profile)
+            out[key] = out.get(key, 0) + (process_tree_rss(child, include_self=True) or 0)
+        else:
+            stack.extend(_children(child))
+    return out
+
+
+def process_tree_rss(pid: int | None = None, include_self: bool = False) -> int | None:
+    """Total resident memory (bytes) of pid's descendants (the Playwright driver and every browser process it
+    started), optionally including pid itself. None where /proc is unavailable."""
+    pid = pid or os.getpid()
+    if not os.path.exists(f"/proc/{pid}/status"):
+        return None
+    total = _rss_bytes(pid) if include_self else 0
+    stack = _children(pid)
+    seen = set()
+    while stack:
+        child = stack.pop()
+        if child in seen:
+            continue
+        seen.add(child)
+        total += _rss_bytes(child)
+        stack.extend(_children(child))
+    return total
@@ -0,0 +1,338 @@
+"""Built-in HTML-to-markdown converter: one streaming html.parser pass, no tree, optional output budget."""
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+
+# Contents dropped entirely (forms' <select>/<textarea> are summarised on their start tag instead)
+_SKIP_TAGS = {"head", "script", "style", "noscript", "template", "svg", "math", "iframe", "object", "canvas"}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "header", "footer", "nav", "aside", "form", "figure", "figcaption",
+    "fieldset", "details", "summary", "dl", "dt", "dd", "address", "caption", "legend", "body", "html",
+}
+# Elements that never have an end tag, so must not be pushed on any stack
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_WRAPS = {"strong": "**", "b": "**", "em": "*", "i": "*", "code": "`"}
+_SPACE_RE = re.compile(r"[ \t\r\n\f]+")
+_ESCAPE_RE = re.compile(r"([*_])")
+CHUNK_CHARS = 64 * 1024
+
+
+class _BudgetReached(Exception):
+    pass
+
+
+class _MarkdownParser(HTMLParser):
+    def __init__(self, max_chars: int | None):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.size = 0  # chars written to the top-level output
+        self.out: list[str] = []  # current target: the document, or a capture (table cell, blockquote, link...)
+        # (tag, saved target, state, saved list item position); text is captured on its own, so item indents owed
+        # when a capture starts are kept for whatever the caller writes once it ends
+        self.captures: list[tuple[str, list[str], dict, tuple]] = []
+        self.skip = 0  # depth inside _SKIP_TAGS
+        self.pre = 0
+        self.lists: list[list] = []  # [ordered, next number, indent of its current item's lines] per open list
+        self.item_start = False  # nothing written since the current list item's marker
+        self.indent: str | None = None  # list item indent owed before the next text, after a line break in an item
+        self.tables: list[dict] = []  # per open table: rows written so far, cells of the row being read
+        self.select: dict | None = None
+
+    # Output helpers
+
+    def _write(self, text: str):
+        if not text:
+            return
+        if self.indent is not None:
+            text, self.indent = self.indent + text, None
+        self.item_start = False
+        self.out.append(text)
+        self.size += len(text)
+        if self.max_chars is not None and self.size >= self.max_chars:
+            raise _BudgetReached
+
+    def _tail(self) -> str:
+        for part in reversed(self.out):
+            if part:
+                return part[-1]
+        return "\n"
+
+    def _block(self):
+        """Start a new block: make sure the output ends with a blank line. Inside a list, start a new line of the
+        current item instead (indented under its marker, like the in-page converter), to keep items whole."""
+        if self.lists:
+            if not self.item_start and self.indent is None:
+                if self._tail() != "\n":
+                    self._write("\n")
+                self.indent = self.lists[-1][2]
+            return
+        tail = "".join(self.out[-2:])[-2:]
+        if self.out and tail != "\n\n":
+            self._write("\n" if tail.endswith("\n") else "\n\n")
+
+    def _newline(self):
+        """End a line inside a block; inside a list the next line is indented under the item's marker."""
+        self._write("\n")
+        if self.lists:
+            self.indent = self.lists[-1][2]
+
+    def _control(self, text: str):
+        """Write a form control summary as its own word."""
+        self._write(text if self._tail() in " \n" else " " + text)
+        self._write(" ")
+
+    def _capture(self, tag: str, **state):
+        self.captures.append((tag, self.out, state, (self.indent, self.item_start)))
+        self.out = []
+        self.indent = None
+
+    def _release(self, tag: str) -> tuple[str, dict] | None:
+        """End the innermost capture for tag (closing any unclosed captures inside it); returns (text, state)."""
+        if not any(c[0] == tag for c in self.captures):
+            return None
+        while True:
+            ctag, saved, state, (self.indent, self.item_start) = self.captures.pop()
+            text, self.out = "".join(self.out), saved
+            if ctag == tag:
+                self.size -= len(text)  # the caller writes it back in its final form
+                return text, state
+            self.out.append(text)
+
+    # Parser callbacks
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip:
+            if tag in _SKIP_TAGS:
+                self.skip += 1
+            return
+        if tag in _SKIP_TAGS:
+            self.skip = 1
+            return
+        attrs = dict(attrs)
+        if self.select is not None:
+            if tag == "option":
+                self.select["options"].append("")
+            return
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._block()
+            self._write("#" * int(tag[1]) + " ")
+        elif tag in _BLOCK_TAGS:
+            self._block()
+        elif tag == "br":
+            self._write("  ")
+            self._newline()
+        elif tag == "hr":
+            self._block()
+            self._write("---\n\n")
+        elif tag == "pre":
+            self._block()
+            self._write("```")
+            self._newline()
+            self.pre += 1
+        elif tag == "code" and self.pre:
+            pass  # the fence already marks it as code
+        elif tag in _WRAPS:
+            self._capture(tag)
+        elif tag == "a":
+            self._capture("a", href=attrs.get("href"))
+        elif tag == "img":
+            if attrs.get("src"):
+                self._write(f"![{attrs.get('alt') or ''}]({attrs['src']})")
+        elif tag in ("ul", "ol"):
+            if not self.lists:
+                self._block()
+            depth = len(self.lists)
+            self.lists.append([tag == "ol", _list_start(attrs.get("start")) if tag == "ol" else 0, "  " * depth])
+        elif tag == "li":
+            depth = max(len(self.lists), 1)
+            ordered, number = self.lists[-1][:2] if self.lists else (False, 0)
+            marker = f"{number}. " if ordered else "- "
+            if self.lists:
+                self.lists[-1][2] = "  " * (depth - 1) + " " * len(marker)
+            if ordered:
+                self.lists[-1][1] += 1
+            self.indent = None
+            if self._tail() != "\n":
+                self._write("\n")
+            self._write("  " * (depth - 1) + marker)
+            self.item_start = True
+        elif tag == "blockquote":
+            self._block()
+            self._capture("blockquote")
+        elif tag == "table":
+            self._block()
+            self.tables.append({"rows": 0, "cells": None})
+        elif tag == "tr" and self.tables:
+            self._end_row()
+            self.tables[-1]["cells"] = []
+        elif tag in ("td", "th") and self.tables:
+            self._end_cell()
+            if self.tables[-1]["cells"] is None:
+                self.tables[-1]["cells"] = []
+            self._capture("cell")
+        elif tag == "input":
+            kind = (attrs.get("type") or "text").lower()
+            if kind != "hidden":
+                self._control(_form_control(kind, attrs))
+        elif tag == "textarea":
+            self._control(_form_control("textarea", attrs))
+            self.skip = 1  # its content is the default value, not page text
+        elif tag == "select":
+            self.select = {"attrs": attrs, "options": []}
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.skip:
+            if tag in _SKIP_TAGS or tag == "textarea":
+                self.skip -= 1
+            return
+        if self.select is not None:
+            if tag == "select":
+                self._control(_form_control("select", self.select["attrs"], self.select["options"]))
+                self.select = None
+            return
+        if tag in ("h1", "h2", "h3", "h4", "h5", "h6") or tag in _BLOCK_TAGS:
+            self._block()
+        elif tag == "pre" and self.pre:
+            self.pre -= 1
+            if self._tail() != "\n":
+                self._newline()
+            self._write("```")
+            self._block()
+        elif tag in _WRAPS:
+            released = self._release(tag)
+            if released is not None:
+                text = released[0]
+                mark = _WRAPS[tag]
+                self._write(f"{mark}{text.strip()}{mark}" if text.strip() else text)
+        elif tag == "a":
+            released = self._release("a")
+            if released is not None:
+                text, state = released
+                href = state.get("href")
+                # Link text must stay on one line, even when the link wraps blocks (card-style links)
+                label = _SPACE_RE.sub(" ", text).strip()
+                if href and not href.startswith("javascript:") and label:
+                    self._write(f"[{label}]({href})")
+                else:
+                    self._write(text)
+        elif tag in ("ul", "ol") and self.lists:
+            self.lists.pop()
+            self.indent = None
+            self._block()
+        elif tag == "blockquote":
+            released = self._release("blockquote")
+            if released is not None:
+                text = re.sub(r"\n{3,}", "\n\n", released[0].strip())
+                indent = self.lists[-1][2] if self.lists else ""
+                for i, line in enumerate(text.split("\n")):
+                    if i:
+                        self._newline()
+                    line = line.removeprefix(indent)
+                    self._write(f"> {line}" if line else ">")
+                self._block()
+        elif tag in ("td", "th") and self.tables:
+            self._end_cell()
+        elif tag == "tr" and self.tables:
+            self._end_row()
+        elif tag == "table" and self.tables:
+            self._end_row()
+            self.tables.pop()
+            self._block()
+
+    def _end_cell(self):
+        released = self._release("cell")
+        if released is not None and self.tables[-1]["cells"] is not None:
+            self.tables[-1]["cells"].append(_SPACE_RE.sub(" ", released[0]).strip().replace("|", "\\|"))
+
+    def _end_row(self):
+        """Write the table row being read (rows are streamed; the first is the header)."""
+        table = self.tables[-1]
+        self._end_cell()
+        cells, table["cells"] = table["cells"], None
+        if not cells:
+            return
+        self._write("| " + " | ".join(cells) + " |")
+        self._newline()
+        if table["rows"] == 0:
+            self._write("| " + " | ".join(["---"] * len(cells)) + " |")
+            self._newline()
+        table["rows"] += 1
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        if self.select is not None:
+            if self.select["options"]:
+                self.select["options"][-1] += data
+            return
+        if self.pre:
+            for i, line in enumerate(data.split("\n")):
+                if i:
+                    self._newline()
+                self._write(line)
+            return
+        text = _SPACE_RE.sub(" ", data)
+        if text.startswith(" ") and self._tail() in " \n":
+            text = text[1:]
+        self._write(_ESCAPE_RE.sub(r"\\\1", text))
+
+    def close_all(self):
+        """Flush captures left open by unclosed tags at the end of the document."""
+        while self.captures:
+            ctag, saved, _, _ = self.captures.pop()
+            text, self.out = "".join(self.out), saved
+            self.out.append(text)
+
+
+def _form_control(kind: str, attrs: dict, options: list[str] | None = None) -> str:
+    label = attrs.get("name") or attrs.get("id") or ""
+    parts = [kind if kind in ("textarea", "select") else f"input {kind}"]
+    if label:
+        parts.append(f"name={label}")
+    if attrs.get("placeholder"):
+        parts.append(f"placeholder={attrs['placeholder']!r}")
+    if attrs.get("value") and kind not in ("password",):
+        parts.append(f"value={attrs['value']!r}")
+    if options:
+        parts.append("options: " + " | ".join(_SPACE_RE.sub(" ", o).strip() for o in options))
+    return "[" + " ".join(parts) + "]"
+
+
+def _list_start(value: str | None) -> int:
+    # Pages put anything in start=; like the in-page converter's Number(...) || 1, fall back to 1
+    try:
+        return int(value or 1)
+    except ValueError:
+        return 1
+
+
+def _tidy(markdown: str) -> str:
+    markdown = re.sub(r"[ \t]+\n\n", "\n\n", markdown)
+    markdown = re.sub(r"\n[ \t]+\n", "\n\n", markdown)
+    return re.sub(r"\n{3,}", "\n\n", markdown).strip()
+
+
+def convert(html: str, max_chars: int | None = None) -> tuple[str, bool]:
+    """Convert HTML to markdown in one pass. Stops once about max_chars of output have been produced.
+
+    Returns (markdown, truncated).
+    """
+    parser = _MarkdownParser(max_chars)
+    truncated = False
+    try:
+        for start in range(0, len(html), CHUNK_CHARS):
+            parser.feed(html[start : start + CHUNK_CHARS])
+        parser.close()
+    except _BudgetReached:
+        truncated = True
+    parser.close_all()
+    markdown = _tidy("".join(parser.out))
+    if truncated and max_chars is not None:
+        markdown = markdown[:max_chars]
+    return markdown, truncated
@@ -8,5 +8,36 @@ PIDFILE_PATH = os.path.join(RUN_DIR, "daemon.pid")
 SCREENSHOT_DIR = os.path.join(_BASE, "screenshots")
 # Persistent browser profile so cookies/session survive daemon restarts
 BROWSER_PROFILE_DIR = os.path.join(_BASE, "browser_profile")
+# Saved cookies/storage for named sessions (the default session uses BROWSER_PROFILE_DIR)
+SESSIONS_DIR = os.path.join(_BASE, "sessions")
 DEFAULT_GO_TIMEOUT_MS = 30_000
 SCREENSHOT_MAX_AGE_SECONDS = 24 * 3600  # 1 day
+# Screenshot directory quota; oldest files are swept past it (override with CLAWFOX_SCREENSHOT_MAX_MB; 0 = none)
+SCREENSHOT_MAX_BYTES = 500 * 1024 * 1024
+# Release the browser after this long without commands (override with CLAWFOX_IDLE_MINUTES; 0 = never)
+DEFAULT_IDLE_MINUTES = 30
+# Memory watchdog limits (override with CLAWFOX_MAX_PAGE_HEAP_MB / CLAWFOX_MAX_BROWSER_RSS_MB; 0 = no limit)
+DEFAULT_MAX_PAGE_HEAP_MB = 512
+DEFAULT_MAX_BROWSER_RSS_MB = 4096
+# Where HTML becomes markdown: "python" (page.content() + markdownify, or the built-in converter without it),
+# "builtin" (page.content() + the streaming html.parser converter) or "page" (one walk of the live DOM in the
+# browser, see PAGE_MARKDOWN_JS). Override with CLAWFOX_CONVERTER.
+DEFAULT_CONVERTER = "python"
+CONVERTERS = ("python", "builtin", "page")
+# Resource types a session or command can block (--block names -> Playwright resource types; "ads" is any request
+# to a domain on the ad/tracker lists in BLOCKLIST_DIR); CLAWFOX_BLOCK sets the list for new sessions
+BLOCKABLE_RESOURCES = {"images": "image", "fonts": "font", "media": "media", "stylesheets": "stylesheet", "ads": "ads"}
+# EasyList-style or hosts-file domain lists, every file loaded (override with CLAWFOX_BLOCKLISTS, a path list)
+BLOCKLIST_DIR = os.path.join(_BASE, "blocklists")
+# Interactive elements listed in a page's output, viewport first; the rest via the elements command (override
+# with CLAWFOX_MAX_ELEMENTS; 0 = all)
+DEFAULT_MAX_ELEMENTS = 200
+# Screenshot after go/show/click/back/forward/reload: "async" (path returned at once, file written in the
+# background, so the capture stays off the reply's path), "sync" (taken before replying, with the change since the
+# previous one) or "on-demand" (none; use the screenshot command). Override with CLAWFOX_SCREENSHOTS or per command
+# with --screenshot.
+DEFAULT_SCREENSHOT_POLICY = "async"
+SCREENSHOT_POLICIES = ("sync", "async", "on-demand")
+# Screenshot encoding; CLAWFOX_SCREENSHOT_FORMAT / _QUALITY / _MAX_WIDTH set daemon-wide defaults
+DEFAULT_SCREENSHOT_FORMAT = "png"
+SCREENSHOT_FORMATS = ("png", "jpeg", "webp")
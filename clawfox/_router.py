@@ -0,0 +1,340 @@
+"""Router: owns SOCKET_PATH and spreads sessions across a pool of worker daemons, one browser each.
+
+Each worker is a normal daemon (python -m clawfox daemon --worker-socket ...) listening on its own socket in
+RUN_DIR. A session sticks to the worker that first served it; the default session always lives on worker 0,
+which owns the persistent browser profile. New sessions go to the least busy worker, and a new worker is started
+when every worker already has requests in flight (up to max_workers). Workers beyond min_workers that have been
+idle for WORKER_IDLE_SECONDS are stopped; their sessions' cookies/storage are saved by the worker on shutdown.
+
+Workers share SCREENSHOT_DIR, so each sweeps only its own screenshots against an equal share of the quota
+(CLAWFOX_SCREENSHOT_MAX_MB / max_workers); worker 0 also removes files left from before the pool started.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+
+from ._client import MAX_RESPONSE_BYTES, wait_for_ready
+from ._paths import RUN_DIR, SOCKET_PATH
+from ._server import (
+    DEFAULT_SESSION,
+    MAX_REQUEST_BYTES,
+    bind_socket,
+    delete_pid,
+    parse_request,
+    response_line,
+    signal_ready,
+    take_ready_fd,
+    write_pid,
+)
+
+WORKER_IDLE_SECONDS = 300
+WORKER_START_TIMEOUT_SECONDS = 60
+
+
+def _worker_socket_path(index: int) -> str:
+    return os.path.join(RUN_DIR, f"worker-{index}.sock")
+
+
+class _Worker:
+    def __init__(self, index: int, env: dict[str, str]):
+        self.index = index
+        self.env = env  # pool settings for the worker's screenshot sweeper
+        self.socket_path = _worker_socket_path(index)
+        self.proc = None
+        self.inflight = 0
+        self.sessions: set[str] = set()
+        self.last_used = time.monotonic()
+
+    async def start(self):
+        # Same readiness handshake the client uses to start a daemon
+        read_fd, write_fd = os.pipe()
+        try:
+            self.proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "clawfox", "daemon",
+                "--worker-socket", self.socket_path,
+                "--worker-index", str(self.index),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                pass_fds=(write_fd,),
+                env=dict(os.environ, **self.env, CLAWFOX_READY_FD=str(write_fd)),
+            )
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        await asyncio.to_thread(wait_for_ready, read_fd, WORKER_START_TIMEOUT_SECONDS, f"clawfox worker {self.index}")
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def request(self, payload: dict) -> dict:
+        """One-off request on a fresh connection (used for stop and sessions)."""
+        reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_RESPONSE_BYTES)
+        try:
+            writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+            await writer.drain()
+            line = await reader.readline()
+            return json.loads(line) if line else {"ok": False, "error": "worker closed the connection"}
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if not self.alive:
+            return
+        try:
+            await asyncio.wait_for(self.request({"cmd": "stop", "args": {}}), 10)
+            await asyncio.wait_for(self.proc.wait(), 10)
+        except Exception:
+            try:
+                self.proc.kill()
+            except ProcessLookupError:
+                pass
+
+
+class _Pool:
+    def __init__(self, min_workers: int, max_workers: int):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.workers: dict[int, _Worker] = {}
+        self.assignments: dict[str, _Worker] = {}  # session name -> worker
+        self.worker_env = {"CLAWFOX_POOL_SIZE": str(self.max_workers), "CLAWFOX_POOL_STARTED": repr(time.time())}
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        await asyncio.gather(*(self._spawn(i) for i in range(self.min_workers)))
+
+    async def _spawn(self, index: int) -> _Worker:
+        worker = self.workers[index] = _Worker(index, self.worker_env)
+        try:
+            await worker.start()
+        except Exception:
+            self.workers.pop(index, None)
+            raise
+        return worker
+
+    async def worker_for(self, session: str) -> _Worker:
+        """Worker that serves this session, assigning (and possibly starting) one on first use."""
+        worker = self.assignments.get(session)
+        if worker is not None and worker.alive:
+            return worker
+        async with self._lock:
+            worker = self.assignments.get(session)
+            if worker is not None and worker.alive:
+                return worker
+            if worker is not None or (session == DEFAULT_SESSION and not self._alive(0)):
+                # Worker died: restart it in place; its sessions come back from saved storage state
+                index = worker.index if worker is not None else 0
+                self._forget(index)
+                worker = await self._spawn(index)
+            elif session == DEFAULT_SESSION:
+                worker = self.workers[0]
+            else:
+                self._reap()
+                live = [w for w in self.workers.values() if w.alive]
+                worker = min(live, key=lambda w: (w.inflight, len(w.sessions)), default=None)
+                if worker is None or (worker.inflight > 0 and len(live) < self.max_workers):
+                    index = next((i for i in range(self.max_workers) if i not in self.workers), None)
+                    if index is None:
+                        raise RuntimeError(f"clawfox worker pool full ({self.max_workers} workers)")
+                    worker = await self._spawn(index)
+            worker.sessions.add(session)
+            self.assignments[session] = worker
+            return worker
+
+    def _alive(self, index: int) -> bool:
+        worker = self.workers.get(index)
+        return worker is not None and worker.alive
+
+    def _reap(self):
+        """Forget workers that died (other than worker 0, restarted in place for the default session), freeing
+        their indexes; their sessions are reassigned on next use and come back from saved storage state."""
+        for index, worker in list(self.workers.items()):
+            if index != 0 and not worker.alive:
+                self._forget(index)
+
+    def _forget(self, index: int):
+        worker = self.workers.pop(index, None)
+        if worker is None:
+            return
+        for name in worker.sessions:
+            if self.assignments.get(name) is worker:
+                del self.assignments[name]
+
+    def release(self, session: str):
+        worker = self.assignments.pop(session, None)
+        if worker is not None:
+            worker.sessions.discard(session)
+
+    async def shrink(self):
+        """Stop idle workers above min_workers (never worker 0)."""
+        now = time.monotonic()
+        async with self._lock:
+            idle = [
+                w for w in self.workers.values()
+                if w.index >= self.min_workers and w.inflight == 0 and now - w.last_used > WORKER_IDLE_SECONDS
+            ]
+            for worker in idle:
+                self._forget(worker.index)
+        for worker in idle:
+            await worker.stop()
+
+    async def sessions(self) -> list[dict]:
+        out = []
+        for worker in list(self.workers.values()):
+            if not worker.alive:
+                continue
+            try:
+                resp = await worker.request({"cmd": "sessions", "args": {}})
+                for entry in json.loads(resp.get("output") or "[]"):
+                    entry["worker"] = worker.index
+                    out.append(entry)
+            except Exception:
+                pass
+        return out
+
+    async def stop(self):
+        await asyncio.gather(*(w.stop() for w in list(self.workers.values())), return_exceptions=True)
+        self.workers.clear()
+        self.assignments.clear()
+
+
+async def _serve_client(reader, writer, pool: _Pool, stop_event: asyncio.Event):
+    """Forward one client's requests, each to the worker owning its session, keeping one upstream per worker."""
+    upstreams: dict[_Worker, tuple] = {}  # worker -> (reader, writer)
+    try:
+        while not stop_event.is_set():
+            try:
+                line = await reader.readline()
+            except ValueError:
+                writer.write(response_line({"ok": False, "error": "request too large"}))
+                await writer.drain()
+                break
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                req_id, cmd, _, session = parse_request(line)
+            except ValueError as e:
+                writer.write(response_line({"ok": False, "error": str(e)}))
+                await writer.drain()
+                continue
+
+            if cmd == "stop":
+                writer.write(response_line({"ok": True, "output": "stopping"}, req_id))
+                await writer.drain()
+                stop_event.set()
+                break
+            if cmd == "sessions":
+                out = json.dumps(await pool.sessions(), indent=2)
+                writer.write(response_line({"ok": True, "output": out}, req_id))
+                await writer.drain()
+                continue
+            if cmd == "close_session" and session not in pool.assignments:
+                writer.write(response_line({"ok": False, "error": f"no open session named {session!r}"}, req_id))
+                await writer.drain()
+                continue
+
+            # Close connections to workers that died or were stopped; a restarted worker is a new _Worker
+            for dead in [w for w in upstreams if not w.alive]:
+                upstreams.pop(dead)[1].close()
+            worker = None
+            try:
+                worker = await pool.worker_for(session)
+                # Count the request before any await so shrink() never stops a worker we are about to use
+                worker.inflight += 1
+                worker.last_used = time.monotonic()
+                try:
+                    up = upstreams.get(worker)
+                    if up is None or up[1].is_closing():
+                        up = upstreams[worker] = await asyncio.open_unix_connection(
+                            worker.socket_path, limit=MAX_RESPONSE_BYTES
+                        )
+                    up[1].write(line if line.endswith(b"\n") else line + b"\n")
+                    await up[1].drain()
+                    resp = await up[0].readline()
+                finally:
+                    worker.inflight -= 1
+                    worker.last_used = time.monotonic()
+                if not resp:
+                    raise RuntimeError(f"clawfox worker {worker.index} closed the connection")
+            except Exception as e:
+                stale = upstreams.pop(worker, None) if worker is not None else None
+                if stale is not None:
+                    stale[1].close()
+                resp = response_line({"ok": False, "error": str(e)}, req_id)
+            else:
+                if cmd == "close_session":
+                    pool.release(session)
+            writer.write(resp)
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        for _, up_writer in upstreams.values():
+            up_writer.close()
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+async def _route(sock: socket.socket, min_workers: int, max_workers: int, ready_fd: int | None):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    pool = _Pool(min_workers, max_workers)
+    await pool.start()
+    server = await asyncio.start_unix_server(
+        lambda r, w: _serve_client(r, w, pool, stop_event),
+        sock=sock,
+        limit=MAX_REQUEST_BYTES,
+    )
+    signal_ready(ready_fd)
+
+    async def shrink_periodically():
+        while True:
+            await asyncio.sleep(30)
+            await pool.shrink()
+
+    shrinker = asyncio.create_task(shrink_periodically())
+    try:
+        await stop_event.wait()
+    finally:
+        shrinker.cancel()
+        server.close()
+        await pool.stop()
+
+
+def run_router(min_workers: int, max_workers: int):
+    """Run the router and its worker pool until stop or SIGTERM."""
+    ready_fd = take_ready_fd()
+    write_pid()
+    try:
+        sock = bind_socket(SOCKET_PATH)
+    except OSError as e:
+        delete_pid()
+        sys.exit(f"clawfox daemon: could not bind socket (another daemon may be running): {e}")
+
+    try:
+        asyncio.run(_route(sock, min_workers, max_workers, ready_fd))
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(SOCKET_PATH)
+        except OSError:
+            pass
+        delete_pid()
@@ -0,0 +1,222 @@
+"""Screenshot files: collision-free names, hardlinked duplicates, change detection between captures, and a
+background sweeper enforcing an age limit and a size quota.
+
+The daemon records every file it writes in an in-memory index ordered by age. The directory is scanned once, on
+the first sweep, to pick up files from earlier runs. After that a sweep only pops expired or over-quota entries
+off the old end of the index, so its cost does not grow with the number of files kept, and nothing runs on the
+screenshot path itself.
+
+Pool workers (see _router) share the directory. The router tells them the pool size and start time
+(CLAWFOX_POOL_SIZE, CLAWFOX_POOL_STARTED): each enforces an equal share of the quota over the files it wrote, and
+only the worker that scans (worker 0) indexes files older than the pool, so no file is counted twice.
+
+A capture whose bytes match a file already in the index is hardlinked to it rather than written again. Change
+detection compares a capture with the tab's previous one: identical digests are unchanged, otherwise (with the
+optional numpy and Pillow) both are decoded to greyscale and diffed to find the bounding box of what changed.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from ._paths import SCREENSHOT_DIR, SCREENSHOT_MAX_AGE_SECONDS, SCREENSHOT_MAX_BYTES
+
+try:
+    import numpy as np
+    from PIL import Image
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+SWEEP_INTERVAL_SECONDS = 60
+# A pixel counts as changed when its greyscale value moves by more than this (absorbs JPEG/WebP noise)
+PIXEL_THRESHOLD = 24
+
+
+def _max_bytes() -> int:
+    """This process's quota: CLAWFOX_SCREENSHOT_MAX_MB (or the default), split evenly across a worker pool."""
+    mb = os.environ.get("CLAWFOX_SCREENSHOT_MAX_MB")
+    total = int(float(mb) * 1024 * 1024) if mb else SCREENSHOT_MAX_BYTES
+    return total // max(int(os.environ.get("CLAWFOX_POOL_SIZE") or 1), 1)
+
+
+def _scan_before() -> float | None:
+    """In a worker pool, only files older than the pool are left for the scan; newer ones belong to a worker."""
+    started = os.environ.get("CLAWFOX_POOL_STARTED")
+    return float(started) if started else None
+
+
+class ScreenshotStore:
+    def __init__(self, directory: str = SCREENSHOT_DIR, max_age: float = SCREENSHOT_MAX_AGE_SECONDS, max_bytes=None):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = _max_bytes() if max_bytes is None else max_bytes  # 0 = no quota
+        self.total_bytes = 0
+        # path -> (mtime, size, content digest or None), oldest first
+        self._files: OrderedDict[str, tuple[float, int, str | None]] = OrderedDict()
+        self._by_digest: dict[str, str] = {}  # content digest -> newest path with that content
+        self._lock = threading.Lock()  # sweeps run in a worker thread
+        self._seq = itertools.count()
+        self._scanned = False
+        self.scan_before = _scan_before()  # only index files older than this when scanning (None = all)
+        self._wake = None  # asyncio.Event set (from any thread) when the quota is exceeded
+        self._loop = None
+
+    def new_path(self, ext: str) -> str:
+        """Unique path: microsecond timestamp plus pid and a counter, so concurrent captures (and workers sharing
+        the directory) never collide."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        stamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S.%f")
+        return os.path.join(self.directory, f"screenshot_{stamp}_{os.getpid()}-{next(self._seq)}.{ext}")
+
+    def write(self, path: str, data: bytes) -> str:
+        """Write data to path and index it; returns its digest. A duplicate of an indexed file is hardlinked to
+        it, anything else is written atomically (readers never see a partial file)."""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            existing = self._by_digest.get(digest)
+        if existing is not None:
+            try:
+                os.link(existing, path)
+                os.utime(path)  # so a later directory scan does not see the link as old
+                self.add(path, len(data), digest=digest, linked=True)
+                return digest
+            except OSError:
+                pass  # swept meanwhile, or no hardlinks on this filesystem: write a copy
+        tmp = path + ".part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.add(path, len(data), digest=digest)
+        return digest
+
+    def add(self, path: str, size: int, mtime: float | None = None, digest: str | None = None, linked=False):
+        with self._lock:
+            old = self._files.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            if linked and self._by_digest.get(digest) in self._files:
+                # The blocks are freed when the last link goes, which is the newest: charge them to it instead
+                prev = self._by_digest[digest]
+                prev_mtime, prev_size, _ = self._files[prev]
+                self._files[prev] = (prev_mtime, 0, digest)
+                self.total_bytes -= prev_size
+            self._files[path] = (time.time() if mtime is None else mtime, size, digest)
+            self.total_bytes += size
+            if digest is not None:
+                self._by_digest[digest] = path
+            over = self.max_bytes and self.total_bytes > self.max_bytes
+        if over and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _scan(self):
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        found = []
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    st = entry.stat()
+                    if self.scan_before is not None and st.st_mtime >= self.scan_before:
+                        continue
+                    found.append((st.st_mtime, entry.path, st.st_size))
+            except OSError:
+                pass
+        with self._lock:
+            known = self._files
+            self._files = OrderedDict(
+                (path, (mtime, size, None)) for mtime, path, size in sorted(found) if path not in known
+            )
+            self._files.update(known)  # files we wrote are newer than anything found on disk
+            self.total_bytes = sum(size for _, size, _ in self._files.values())
+
+    def sweep(self) -> int:
+        """Delete files older than max_age, then the oldest files until under max_bytes. Returns files removed."""
+        if not self._scanned:
+            self._scan()
+            self._scanned = True
+        cutoff = time.time() - self.max_age
+        removed = 0
+        while True:
+            with self._lock:
+                if not self._files:
+                    break
+                path, (mtime, size, digest) = next(iter(self._files.items()))
+                if mtime >= cutoff and not (self.max_bytes and self.total_bytes > self.max_bytes):
+                    break
+                del self._files[path]
+                self.total_bytes -= size
+                if digest is not None and self._by_digest.get(digest) == path:
+                    del self._by_digest[digest]
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass  # already gone
+        return removed
+
+    async def run_sweeper(self, scan: bool = True):
+        """Sweep every SWEEP_INTERVAL_SECONDS, or as soon as a write takes the directory over quota. Without scan,
+        files this process did not write are left alone (pool workers other than worker 0)."""
+        self._scanned = not scan
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            await asyncio.to_thread(self.sweep)
+            try:
+                await asyncio.wait_for(self._wake.wait(), SWEEP_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+def _greyscale(data: bytes):
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert("L"))
+    except (OSError, ValueError):
+        return None  # e.g. a Pillow built without WebP
+
+
+def changed_region(old, new) -> tuple[int, int, int, int] | None:
+    """Bounding box (x, y, width, height) of the pixels that differ between two greyscale images, or None."""
+    if old.shape != new.shape:
+        return 0, 0, new.shape[1], new.shape[0]
+    mask = np.abs(old.astype(np.int16) - new.astype(np.int16)) > PIXEL_THRESHOLD
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1)
+
+
+def compare(previous: tuple | None, digest: str, data: bytes) -> tuple[str | None, tuple]:
+    """Compare a capture with the previous one, passed as the state this returned for it. Returns (change, state).
+
+    change is "changed: false", "changed: x=X y=Y width=W height=H" (in image pixels), "changed: true" when the
+    images differ but numpy/Pillow are not installed, or None when there is no previous capture.
+    """
+    if previous is not None and previous[0] == digest:
+        return "changed: false", previous
+    pixels = _greyscale(data) if HAS_NUMPY else None
+    state = (digest, pixels)
+    if previous is None:
+        return None, state
+    if pixels is None or previous[1] is None:
+        return "changed: true", state
+    box = changed_region(previous[1], pixels)
+    if box is None:
+        return "changed: false", state
+    return "changed: x=%d y=%d width=%d height=%d" % box, state
+
+
+store = ScreenshotStore()
@@ -0,0 +1,85 @@
+"""Socket-server plumbing shared by the daemon and the router: request lines, pidfile, readiness pipe, listening socket.
+
+Kept free of Playwright and the page converters so the router process, which only forwards request lines to its
+workers, never loads them.
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+
+from ._paths import PIDFILE_PATH, RUN_DIR
+
+MAX_REQUEST_BYTES = 1_000_000
+DEFAULT_SESSION = "default"
+
+
+def parse_request(line: bytes) -> tuple:
+    """(id, cmd, args, session name) of one request line. Raises ValueError if it is not a JSON object."""
+    req = json.loads(line.decode("utf-8", errors="replace"))
+    if not isinstance(req, dict):
+        raise ValueError("request must be a JSON object")
+    return req.get("id"), req.get("cmd", ""), req.get("args", req), req.get("session") or DEFAULT_SESSION
+
+
+def response_line(result: dict, req_id=None) -> bytes:
+    """One response line, echoing the request's id if it had one."""
+    if req_id is not None:
+        result["id"] = req_id
+    return (json.dumps(result) + "\n").encode("utf-8")
+
+
+def write_pid(path: str = PIDFILE_PATH):
+    os.makedirs(RUN_DIR, mode=0o700, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(str(os.getpid()))
+
+
+def delete_pid(path: str = PIDFILE_PATH):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def take_ready_fd() -> int | None:
+    """Readiness pipe inherited from whoever started us (see _client.ensure_daemon). Removed from the environment
+    so processes we start don't see it."""
+    value = os.environ.pop("CLAWFOX_READY_FD", "")
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def signal_ready(fd: int | None):
+    """Tell the starting process we are serving. Exiting without calling this closes the pipe, which it sees as failure."""
+    if fd is None:
+        return
+    try:
+        os.write(fd, b"1")
+    except OSError:
+        pass
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+
+
+def bind_socket(path: str) -> socket.socket:
+    """Bind and listen on a Unix socket at path (replacing a stale socket file). Raises OSError."""
+    if os.path.exists(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    os.makedirs(RUN_DIR, mode=0o700, exist_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+    except OSError:
+        sock.close()
+        raise
+    sock.listen(128)
+    return sock